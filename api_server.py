@@ -0,0 +1,230 @@
+"""Headless HTTP API for the email generator, for programmatic clients.
+
+Usage:
+    python api_server.py --workers 4            # serve on http://127.0.0.1:8000
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=test python api_server.py   # against fake_groq_server.py
+
+Endpoints (JSON in, JSON out):
+    POST /generate         generate_email fields -> {"email"}
+    POST /generate/stream  same body -> text/event-stream of {"text"} events, then a "done" event
+    POST /improve          {"email", "deep"} -> {"suggestions"}
+    POST /batch            {"requests": [...], "concurrency"} -> {"results"}
+    GET  /health
+    GET  /stats            scheduler queue depth and wait times per priority class
+"""
+import os
+import json
+import argparse
+import uvicorn
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from async_email_generator import AsyncEmailGenerator, EMAIL_REQUEST_FIELDS
+from request_scheduler import (
+    DEFAULT_MAX_CONCURRENCY, DEFAULT_REQUESTS_PER_MINUTE, DEFAULT_TOKENS_PER_MINUTE, RequestScheduler
+)
+from ui_assets import LENGTH_OPTIONS, PURPOSE_OPTIONS, TONE_OPTIONS
+
+DEFAULT_WORKERS = int(os.getenv("EMAIL_API_WORKERS", "1"))
+MAX_BATCH_SIZE = int(os.getenv("EMAIL_API_MAX_BATCH", "100"))
+# Same choices as the app's form; token budgets and the cache are keyed on these
+FIELD_OPTIONS = {"purpose": PURPOSE_OPTIONS, "tone": TONE_OPTIONS, "length": LENGTH_OPTIONS}
+# Idle client connections are kept open this long so callers can reuse them
+DEFAULT_KEEP_ALIVE_SECONDS = 30
+
+
+class BadRequest(Exception):
+    pass
+
+
+def worker_scheduler(workers=None):
+    """Scheduler for one worker process, holding its share of the account's Groq quota.
+
+    Every worker process has its own scheduler, so the configured limits are split evenly;
+    the rate-limit headers on each response keep the shares in sync with the real quota.
+    """
+    workers = max(1, workers or DEFAULT_WORKERS)
+    return RequestScheduler(
+        requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE / workers,
+        tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE / workers,
+        max_concurrency=max(1, DEFAULT_MAX_CONCURRENCY // workers),
+    )
+
+
+async def _read_json(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("Request body must be JSON.")
+    if not isinstance(body, dict):
+        raise BadRequest("Request body must be a JSON object.")
+    return body
+
+
+def _email_fields(body, prefix=""):
+    missing = [name for name in EMAIL_REQUEST_FIELDS if body.get(name) in (None, "")]
+    if missing:
+        raise BadRequest(f"{prefix}Request is missing fields: {', '.join(missing)}")
+    invalid = [name for name in EMAIL_REQUEST_FIELDS if not isinstance(body[name], str) or not body[name].strip()]
+    if invalid:
+        raise BadRequest(f"{prefix}Fields must be non-empty strings: {', '.join(invalid)}")
+    for name, options in FIELD_OPTIONS.items():
+        if body[name] not in options:
+            raise BadRequest(f'{prefix}"{name}" must be one of: {", ".join(options)}')
+    return {name: body[name] for name in EMAIL_REQUEST_FIELDS}
+
+
+def _bool_field(body, name, default):
+    value = body.get(name, default)
+    if not isinstance(value, bool):
+        raise BadRequest(f'"{name}" must be true or false.')
+    return value
+
+
+def _positive_int_field(body, name):
+    value = body.get(name)
+    if value is None:
+        return None
+    # bool is an int subclass, but "concurrency": true is a client bug
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise BadRequest(f'"{name}" must be a positive integer.')
+    return value
+
+
+def _error(status, message):
+    return JSONResponse({"error": message}, status_code=status)
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def health(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def stats(request):
+    return JSONResponse(request.app.state.generator.scheduler.stats())
+
+
+async def generate(request):
+    try:
+        body = await _read_json(request)
+        fields = _email_fields(body)
+        use_cache = _bool_field(body, "use_cache", True)
+    except BadRequest as e:
+        return _error(400, str(e))
+    try:
+        email_text = await request.app.state.generator.generate_email(**fields, use_cache=use_cache)
+    except Exception as e:
+        return _error(502, str(e))
+    return JSONResponse({"email": email_text})
+
+
+async def generate_stream(request):
+    try:
+        body = await _read_json(request)
+        fields = _email_fields(body)
+        use_cache = _bool_field(body, "use_cache", True)
+    except BadRequest as e:
+        return _error(400, str(e))
+    generator = request.app.state.generator
+
+    async def events():
+        parts = []
+        try:
+            async for text in generator.generate_email_stream(**fields, use_cache=use_cache):
+                parts.append(text)
+                yield _sse({"text": text})
+        except Exception as e:
+            yield _sse({"error": str(e)}, event="error")
+            return
+        yield _sse({"email": "".join(parts)}, event="done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def improve(request):
+    try:
+        body = await _read_json(request)
+        if body.get("email") in (None, ""):
+            raise BadRequest('Request is missing field: email')
+        if not isinstance(body["email"], str) or not body["email"].strip():
+            raise BadRequest('"email" must be a non-empty string.')
+        use_cache = _bool_field(body, "use_cache", True)
+        deep = _bool_field(body, "deep", False)
+    except BadRequest as e:
+        return _error(400, str(e))
+    suggestions = await request.app.state.generator.improve_email(body["email"], use_cache=use_cache, deep=deep)
+    return JSONResponse({"suggestions": suggestions})
+
+
+async def batch(request):
+    try:
+        body = await _read_json(request)
+        requests = body.get("requests")
+        if not isinstance(requests, list) or not requests:
+            raise BadRequest('"requests" must be a non-empty list.')
+        if not all(isinstance(item, dict) for item in requests):
+            raise BadRequest('Each entry in "requests" must be a JSON object.')
+        if len(requests) > MAX_BATCH_SIZE:
+            raise BadRequest(f"At most {MAX_BATCH_SIZE} requests per batch.")
+        requests = [_email_fields(item, prefix=f"requests[{index}]: ") for index, item in enumerate(requests)]
+        concurrency = _positive_int_field(body, "concurrency")
+        use_cache = _bool_field(body, "use_cache", True)
+    except BadRequest as e:
+        return _error(400, str(e))
+    # Batches run at bulk priority, behind this worker's /generate and /improve calls
+    results = await request.app.state.generator.generate_emails_batch(
+        requests, concurrency=concurrency, use_cache=use_cache
+    )
+    return JSONResponse({"results": results})
+
+
+def create_app(generator=None):
+    """Builds the ASGI app. Each worker process creates one generator, and so one pooled Groq client."""
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.generator = generator or AsyncEmailGenerator(scheduler=worker_scheduler())
+        try:
+            yield
+        finally:
+            if generator is None:
+                await app.state.generator.aclose()
+
+    return Starlette(
+        routes=[
+            Route("/health", health, methods=["GET"]),
+            Route("/stats", stats, methods=["GET"]),
+            Route("/generate", generate, methods=["POST"]),
+            Route("/generate/stream", generate_stream, methods=["POST"]),
+            Route("/improve", improve, methods=["POST"]),
+            Route("/batch", batch, methods=["POST"]),
+        ],
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the email generator over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes")
+    parser.add_argument("--keep-alive", type=int, default=DEFAULT_KEEP_ALIVE_SECONDS,
+                        help="Seconds to keep idle client connections open")
+    args = parser.parse_args()
+    # Worker processes read this to take their share of the Groq quota
+    os.environ["EMAIL_API_WORKERS"] = str(args.workers)
+    uvicorn.run(
+        "api_server:app", host=args.host, port=args.port, workers=args.workers,
+        timeout_keep_alive=args.keep_alive, log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
-import google.generativeai as genai
 import os
-from dotenv import load_dotenv
+import sys
+import argparse
 import logging
+from groq import Groq
+from dotenv import load_dotenv
+from model_registry import ModelRegistry
 
 # Suppress noisy logs from the HTTP client
 logging.basicConfig(level=logging.ERROR)
@@ -9,52 +12,50 @@ logging.basicConfig(level=logging.ERROR)
 # Load environment variables
 load_dotenv()
 
-def find_working_model():
-    """Connects to Google AI and finds a working model for text generation."""
-    api_key = os.getenv("GOOGLE_API_KEY")
+
+def find_working_model(refresh=True):
+    """Discovers and probes the Groq models this API key can use, and returns the fastest one.
+
+    Results are saved to the model registry file, where EmailGenerator picks them up at
+    startup, so there is no need to copy the model name anywhere.
+    """
+    api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
-        print("❌ GOOGLE_API_KEY not found in .env file. Please check the file.")
-        return
-
-    try:
-        genai.configure(api_key=api_key)
-        print("✅ Successfully connected to Google AI.")
-        print("🔎 Searching for a model that supports text generation...\n")
-
-        # Find a model that supports the 'generateContent' method
-        working_model = None
-        for m in genai.list_models():
-            if 'generateContent' in m.supported_generation_methods:
-                # Prefer a 'gemini-pro' model if available
-                if 'gemini-1.0-pro' in m.name:
-                    working_model = m.name
-                    break # Found the best one, stop searching
-                elif 'gemini-pro' in m.name:
-                    working_model = m.name
-                    break
-        
-        # If no pro model was found, take the first available one
-        if not working_model:
-             for m in genai.list_models():
-                if 'generateContent' in m.supported_generation_methods:
-                    working_model = m.name
-                    break
-
-        if working_model:
-            # The SDK expects the name without the "models/" prefix
-            final_model_name = working_model.replace("models/", "")
-            print("🎉 SUCCESS! Found a working model for your API key.")
-            print("\n=====================================================================")
-            print(f"  Your model name is:  '{final_model_name}'")
-            print("=====================================================================")
-            print("\nNEXT STEP: Please copy this exact model name into your `email_generator.py` file.")
+        print("❌ GROQ_API_KEY not found in .env file. Please check the file.")
+        return None
+
+    registry = ModelRegistry(Groq(api_key=api_key, max_retries=0))
+    if refresh or registry.is_stale():
+        print("🔎 Discovering and probing chat models...\n")
+        try:
+            registry.refresh()
+        except Exception as e:
+            print(f"❌ An error occurred while listing or probing models: {e}")
+            print("Please ensure your API key is correct.")
+            return None
+
+    print(f"{'model':40} {'TTFT (s)':>9} {'tok/s':>8}  status")
+    for model, result in sorted(registry.results().items()):
+        if result.get("ok"):
+            print(f"{model:40} {result['ttft']:>9.3f} {result.get('tokens_per_second') or 0:>8.1f}  ok")
         else:
-            print("❌ CRITICAL ERROR: No models supporting text generation were found for your API key.")
-            print("This is highly unusual and suggests an issue with your Google Cloud project's permissions or region.")
+            print(f"{model:40} {'-':>9} {'-':>8}  failed: {result.get('error', '')[:60]}")
+
+    ranked = registry.ranked()
+    if not ranked:
+        print("\n❌ No working chat models were found for your API key.")
+        return None
+    print(f"\n🎉 Fastest model: '{ranked[0]}' (saved to {registry.path}; the app uses it automatically).")
+    return ranked[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Discover and benchmark the Groq models available to your API key.")
+    parser.add_argument("--cached", action="store_true", help="Show the saved results unless they have expired")
+    args = parser.parse_args()
+    if find_working_model(refresh=not args.cached) is None:
+        sys.exit(1)
 
-    except Exception as e:
-        print(f"❌ An error occurred while trying to connect or list models: {e}")
-        print("Please ensure your API key is correct and that the 'Generative Language API' is enabled in your Google Cloud project.")
 
 if __name__ == "__main__":
-    find_working_model()
\ No newline at end of file
+    main()
@@ -1,6 +1,14 @@
 import streamlit as st
 import time
+import functools
 from email_generator import EmailGenerator
+from improve_prefetcher import DEFAULT_PREFETCH_WAIT_SECONDS, ImprovementPrefetcher
+from metrics import get_metrics
+from ui_assets import (
+    BANNER_HTML, CONTACT_HTML, CUSTOM_CSS, LENGTH_OPTIONS, PURPOSE_OPTIONS, TEMPLATES, TIPS_HTML, TONE_OPTIONS
+)
+
+run_started = time.perf_counter()
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -9,313 +17,289 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- CUSTOM CSS FOR PROFESSIONAL STYLING (Aurora Modern Flexbox Theme) ---
-st.markdown("""
-<style>
-    /* Main Background & Font */
-    html, body, .reportview-container {
-        background: radial-gradient(circle at 20% 40%, #e8eaf6 0%, #f0f4c3 100%);
-        font-family: 'Inter', 'Segoe UI', 'Tahoma', 'Geneva', 'Verdana', sans-serif;
-    }
-
-    .main .block-container {
-        padding: 2rem 2rem;
-    }
-
-    /* Custom Banner */
-    .banner {
-        background: linear-gradient(120deg, #00bcd4 10%, #8e24aa 90%);
-        padding: 2.5rem 2rem;
-        border-radius: 24px;
-        margin-bottom: 2.5rem;
-        box-shadow: 0 10px 32px -8px rgba(0, 188, 212, 0.15), 0 1.5px 9px #8e24aa44;
-        display: flex;
-        flex-direction: column;
-        align-items: flex-start;
-    }
-    .banner h1 {
-        color: white;
-        font-size: 3rem;
-        font-weight: 800;
-        margin-bottom: 0.5rem;
-        letter-spacing: 1px;
-        text-shadow: 0px 2px 8px #8e24aa66;
-    }
-    .banner p {
-        color: #e0e7ff;
-        font-size: 1.4rem;
-        font-weight: 400;
-        margin-top: 0;
-        text-shadow: 0px 0.5px 8px #00bcd444;
-    }
-
-    /* Form Container */
-    .form-container {
-        background-color: rgba(255,255,255,0.96);
-        border-radius: 22px;
-        padding: 2.5rem;
-        box-shadow: 0 8px 24px rgba(0,0,0,0.07);
-        border: 1px solid #ede7f6;
-        margin-bottom: 2rem;
-    }
-
-    /* Generated Email & Suggestions Flex Card */
-    .result-card {
-        background-color: #fff;
-        border-radius: 22px;
-        padding: 2rem;
-        margin-top: 2rem;
-        border: 1px solid #e0e0e0;
-        box-shadow: 0 6px 18px rgba(0,0,0,0.09);
-        display: flex;
-        flex-direction: column;
-        align-items: stretch;
-        max-width: 900px;
-        margin-left: auto;
-        margin-right: auto;
-    }
-    .result-card h3 {
-        color: #512da8;
-        border-bottom: 2px solid #00bcd4;
-        padding-bottom: 0.5rem;
-        margin-bottom: 1rem;
-        font-size: 1.28rem;
-        font-weight: 700;
-    }
-    .email-flex {
-        display: flex;
-        flex-direction: column;
-        align-items: stretch;
-        width: 100%;
-        min-height: 200px;
-        max-height: 60vh;
-        overflow-y: auto;
-        background: #f6f9ff;
-        border-radius: 13px;
-        font-size: 1.08rem;
-        padding: 1.2rem 1rem;
-        color: #333;
-        margin-bottom: 1rem;
-        box-shadow: 0 2px 8px #e3e3e3;
-        word-break: break-word;
-        white-space: pre-wrap;
-    }
-
-    /* Expander styling */
-    .stExpander {
-        border-radius: 16px !important;
-        border: 1px solid #d1c4e9 !important;
-        background-color: #f7f6fc;
-    }
-    .stExpander header {
-        font-size: 1.09rem;
-        font-weight: 600;
-    }
-
-    /* Button Styling */
-    .stButton>button {
-        border-radius: 14px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 600;
-        border: none;
-        color: white;
-        background: linear-gradient(120deg, #00bcd4 0%, #8e24aa 100%);
-        transition: all 0.2s ease;
-        box-shadow: 0 4px 15px -5px #00bcd488;
-        font-size: 1.06rem;
-        margin-bottom: 0.5rem;
-    }
-    .stButton>button:hover {
-        transform: translateY(-2px) scale(1.03);
-        box-shadow: 0 7px 24px -6px #8e24aa88;
-        background: linear-gradient(120deg, #8e24aa 0%, #00bcd4 100%);
-    }
-    .stButton>button:active {
-        transform: translateY(0);
-        box-shadow: 0 4px 15px -5px #00bcd488;
-    }
-
-    /* Copy to Clipboard Button */
-    .copy-btn {
-        background: linear-gradient(90deg, #66bb6a 0%, #43a047 100%);
-        color: white;
-        border: none;
-        border-radius: 10px;
-        padding: 0.6rem 1.3rem;
-        font-size: 1rem;
-        font-weight: 600;
-        margin-top: 0.75rem;
-        margin-bottom: 0.5rem;
-        cursor: pointer;
-        box-shadow: 0 2px 8px #66bb6a33;
-        transition: all 0.17s ease;
-    }
-    .copy-btn:hover {
-        background: linear-gradient(90deg, #43a047 0%, #66bb6a 100%);
-        box-shadow: 0 4px 16px #43a04733;
-        transform: scale(1.04);
-    }
-
-    /* Footer */
-    .footer {
-        text-align: center;
-        color: #888;
-        font-size: 0.97rem;
-        margin-top: 3rem;
-        padding-bottom: 1.5rem;
-        letter-spacing: 0.02em;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# --- BANNER ---
-st.markdown(
-    """
-    <div class="banner">
-        <h1>📧 AI Email Assistant</h1>
-        <p>Generate professional emails with the perfect tone, formatting, and content.</p>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
+# --- STATIC ASSETS ---
+# The CSS, banner, templates and tips live in ui_assets and are built once per process.
+# They are only emitted on full reruns; the interactive sections below are fragments that
+# rerun on their own, so most clicks never re-send them.
+st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
+st.markdown(BANNER_HTML, unsafe_allow_html=True)
 
 # --- INITIALIZATION LOGIC (No changes) ---
 @st.cache_resource
 def load_generator():
     try:
         generator = EmailGenerator()
+        generator.health.refresh()  # Warm the shared health probe in the background
         return generator
     except Exception as e:
         st.error(f"Failed to initialize Email Generator: {str(e)}")
         return None
 
+@st.cache_resource
+def load_prefetcher(_generator):
+    return ImprovementPrefetcher(_generator)
+
 if "generator" not in st.session_state:
     st.session_state.generator = load_generator()
-    
-if st.session_state.generator:
-    if "connection_tested" not in st.session_state:
-        with st.spinner("Testing GROQ API connection..."):
-            connection_ok, message = st.session_state.generator.test_connection()
-            st.session_state.connection_tested = True
-            st.session_state.connection_ok = connection_ok
-            st.session_state.connection_message = message
-else:
-    st.session_state.connection_tested = False
-    st.session_state.connection_ok = False
+prefetcher = load_prefetcher(st.session_state.generator) if st.session_state.generator else None
 
-# --- CONNECTION STATUS (No changes) ---
-if "connection_tested" in st.session_state:
-    if st.session_state.connection_ok:
-        st.success(f"✅ Connection Status: {st.session_state.connection_message}")
+# --- CONNECTION STATUS ---
+# The health probe is shared by all sessions and refreshed in the background;
+# the form stays usable while it is pending.
+if st.session_state.generator:
+    connection_state, connection_message = st.session_state.generator.health.status(wait=0.5)
+    if connection_state == "ok":
+        st.success(f"✅ Connection Status: {connection_message}")
+    elif connection_state == "pending":
+        st.info("⏳ Connection Status: Checking Groq API connection in the background...")
     else:
-        st.warning(f"⚠️ Connection Status: {st.session_state.connection_message}")
+        st.warning(f"⚠️ Connection Status: {connection_message}")
         if st.button("Retry Connection"):
             with st.spinner("Testing connection..."):
-                connection_ok, message = st.session_state.generator.test_connection()
-                st.session_state.connection_ok = connection_ok
-                st.session_state.connection_message = message
+                st.session_state.generator.test_connection()
                 st.rerun()
+else:
+    st.warning("⚠️ Connection Status: Email Generator is not available.")
 
-# --- FORM SECTION ---
-st.markdown('<div class="form-container">', unsafe_allow_html=True)
-with st.form("email_form"):
-    st.header("Craft Your Email")
-    col1, col2 = st.columns(2)
-    with col1:
-        recipient = st.text_input("Recipient", placeholder="e.g., John Doe, HR Manager")
-        sender = st.text_input("Your Name/Role", placeholder="e.g., Jane Smith, Developer")
-    with col2:
-        purpose_options = ["Request Information", "Job Application", "Follow-up", "Thank You", "Proposal", "Apology", "Introduction", "Meeting Request", "Feedback", "Other"]
-        purpose = st.selectbox("Email Purpose", purpose_options)
-        tone_options = ["Professional", "Friendly", "Formal", "Casual", "Urgent", "Persuasive", "Apologetic"]
-        tone = st.selectbox("Tone", tone_options)
-        length_options = ["Short", "Medium", "Long"]
-        length = st.selectbox("Length", length_options)
-    
-    # key_points = st.text_area("Key Points to Include", height=150, placeholder="Enter the main points, requests, or questions for your email...")
-    key_points = st.text_area(
-        "Key Points to Include",
-        height=150,
-        value=st.session_state.get("key_points_template", ""),  # <-- Use the template if present
-        placeholder="Enter the main points you want to include in your email..."
-    )
-    generate_button = st.form_submit_button("Generate Email")
-st.markdown('</div>', unsafe_allow_html=True)
+# --- FRAGMENT HELPERS ---
+# Each section below is a fragment: widgets inside it rerun only that section. Sections
+# talk to each other through session state and keyed reruns from widget callbacks.
+def debug_mode():
+    return st.session_state.get("debug_mode", False)
 
-# --- FORM SUBMISSION LOGIC (No changes) ---
-if generate_button:
-    if not recipient or not sender or not key_points:
-        st.error("Please fill in all required fields.")
+def timed_fragment(key):
+    """st.fragment that records its render time and shows it in debug mode."""
+    def decorator(func):
+        @st.fragment(key=key)
+        @functools.wraps(func)
+        def wrapper():
+            started = time.perf_counter()
+            func()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            st.session_state.setdefault("rerun_times", {})[key] = elapsed_ms
+            if debug_mode():
+                st.caption(f"⏱️ {key} rendered in {elapsed_ms:.1f} ms")
+        return wrapper
+    return decorator
+
+def submit_email_form():
+    """Form callback: queues the request and reruns only the results and suggestions."""
+    state = st.session_state
+    if not state.form_recipient or not state.form_sender or not state.form_key_points:
+        state.form_error = "Please fill in all required fields."
     else:
-        with st.spinner("Generating your email..."):
+        state.pending_request = {
+            "key_points": state.form_key_points, "recipient": state.form_recipient, "sender": state.form_sender,
+            "purpose": state.form_purpose, "tone": state.form_tone, "length": state.form_length,
+            "compare_tones": [t for t in state.form_compare_tones if t != state.form_tone],
+            "use_cache": not state.form_fresh_draft,
+        }
+    st.rerun(["results", "suggestions"])
+
+def use_variant(email_text):
+    st.session_state.email_text = email_text
+    st.session_state.suggestions = None
+    st.session_state.variants = None
+    prefetcher.prefetch(email_text)
+    st.rerun(["results", "suggestions"])
+
+def request_improvement(deep):
+    st.session_state.pending_improvement = {"deep": deep}
+    st.rerun("suggestions")
+
+def use_template(template_name):
+    st.session_state.form_key_points = st.session_state[f"template_text_{template_name}"]
+    st.rerun("email_form")
+
+# --- FORM SECTION ---
+@timed_fragment("email_form")
+def email_form():
+    st.markdown('<div class="form-container">', unsafe_allow_html=True)
+    with st.form("email_form"):
+        st.header("Craft Your Email")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.text_input("Recipient", placeholder="e.g., John Doe, HR Manager", key="form_recipient")
+            st.text_input("Your Name/Role", placeholder="e.g., Jane Smith, Developer", key="form_sender")
+        with col2:
+            st.selectbox("Email Purpose", PURPOSE_OPTIONS, key="form_purpose")
+            st.selectbox("Tone", TONE_OPTIONS, key="form_tone")
+            st.selectbox("Length", LENGTH_OPTIONS, key="form_length")
+
+        st.text_area(
+            "Key Points to Include",
+            height=150,
+            key="form_key_points",  # "Use This Template" fills this in
+            placeholder="Enter the main points you want to include in your email..."
+        )
+        st.multiselect(
+            "Compare with other tones (optional)", TONE_OPTIONS, key="form_compare_tones",
+            help="Writes a version in each selected tone as well, in one request, and shows them side by side."
+        )
+        st.checkbox("Always write a fresh draft", key="form_fresh_draft",
+                    help="Skip the cache and ask the model for a new version.")
+        st.form_submit_button("Generate Email", on_click=submit_email_form,
+                              disabled=st.session_state.generator is None)
+    st.markdown('</div>', unsafe_allow_html=True)
+
+# --- FORM SUBMISSION LOGIC ---
+def run_request(request):
+    """Generates the queued request, streaming a single draft into the results section."""
+    generator = st.session_state.generator
+    fields = {name: request[name] for name in ("key_points", "recipient", "sender", "purpose")}
+    st.session_state.suggestions = None
+    if request["compare_tones"]:
+        tones = [request["tone"]] + request["compare_tones"]
+        with st.spinner(f"Writing {len(tones)} versions..."):
             try:
-                email_text = st.session_state.generator.generate_email(
-                    key_points=key_points, recipient=recipient, sender=sender,
-                    purpose=purpose, tone=tone, length=length
+                st.session_state.variants = generator.generate_variants(
+                    **fields, tones=tones, lengths=[request["length"]], use_cache=request["use_cache"]
                 )
-                st.session_state.email_text = email_text
-                st.session_state.suggestions = None # Reset suggestions
+                st.session_state.email_text = None
             except Exception as e:
                 st.error(f"Error during email generation: {str(e)}")
+        return
+    st.session_state.variants = None
+    # Stream the draft into a temporary card; it is replaced by the full result card below
+    stream_placeholder = st.empty()
+    email_text = ""
+    try:
+        for chunk in generator.generate_email_stream(
+            **fields, tone=request["tone"], length=request["length"], use_cache=request["use_cache"]
+        ):
+            email_text += chunk
+            stream_placeholder.markdown(
+                f'<div class="result-card"><h3>Generated Email</h3><div class="email-flex">{email_text}▌</div></div>',
+                unsafe_allow_html=True
+            )
+        # Fetch suggestions for the new draft in the background; drop the previous draft's prefetch
+        if st.session_state.get("email_text") and st.session_state.email_text != email_text:
+            prefetcher.cancel(st.session_state.email_text)
+        st.session_state.email_text = email_text
+        prefetcher.prefetch(email_text)
+    except Exception as e:
+        st.error(f"Error during email generation: {str(e)}")
+    stream_placeholder.empty()
 
 # --- DISPLAY RESULTS ---
-if "email_text" in st.session_state and st.session_state.email_text:
-    st.markdown('<div class="result-card">', unsafe_allow_html=True)
-    st.markdown('<h3>Generated Email</h3>', unsafe_allow_html=True)
-    st.markdown(f'<div class="email-flex" id="emailToCopy">{st.session_state.email_text}</div>', unsafe_allow_html=True)
-    # Copy to Clipboard Button (uses JS directly)
-    col1, col2 = st.columns(2)
-    with col1:
-        st.code(st.session_state.email_text, language="", line_numbers=False)  # Has native copy button
-    with col2:
-        if st.button("Improve This Email"):
-            with st.spinner("Analyzing and suggesting improvements..."):
-                suggestions = st.session_state.generator.improve_email(st.session_state.email_text)
-                st.session_state.suggestions = suggestions
-    st.markdown('</div>', unsafe_allow_html=True)
+@timed_fragment("results")
+def results():
+    form_error = st.session_state.pop("form_error", None)
+    if form_error:
+        st.error(form_error)
+    request = st.session_state.pop("pending_request", None)
+    if request:
+        run_request(request)
 
-if "suggestions" in st.session_state and st.session_state.suggestions:
-    st.markdown('<div class="result-card">', unsafe_allow_html=True)
-    st.markdown('<h3>Suggested Improvements</h3>', unsafe_allow_html=True)
-    st.write(st.session_state.suggestions)
-    st.markdown('</div>', unsafe_allow_html=True)
+    if st.session_state.get("variants"):
+        st.markdown('<div class="result-card">', unsafe_allow_html=True)
+        st.markdown('<h3>Compare Versions</h3>', unsafe_allow_html=True)
+        for column, variant in zip(st.columns(len(st.session_state.variants)), st.session_state.variants):
+            with column:
+                st.markdown(f"**{variant['tone']}**")
+                st.markdown(f'<div class="email-flex">{variant["email"]}</div>', unsafe_allow_html=True)
+                st.button("Use this version", key=f"use_variant_{variant['tone']}",
+                          on_click=use_variant, args=(variant["email"],))
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    if st.session_state.get("email_text"):
+        st.markdown('<div class="result-card">', unsafe_allow_html=True)
+        st.markdown('<h3>Generated Email</h3>', unsafe_allow_html=True)
+        st.markdown(f'<div class="email-flex" id="emailToCopy">{st.session_state.email_text}</div>', unsafe_allow_html=True)
+        # Copy to Clipboard Button (uses JS directly)
+        col1, col2 = st.columns(2)
+        with col1:
+            st.code(st.session_state.email_text, language="", line_numbers=False)  # Has native copy button
+        with col2:
+            # Only the suggestions section reruns; prefetched suggestions are reused, and
+            # drafts that pass the local checks never reach Groq
+            st.button("Improve This Email", on_click=request_improvement, args=(False,))
+            st.button("Get deeper suggestions", on_click=request_improvement, args=(True,))
+        cache_stats = st.session_state.generator.cache_stats()
+        if cache_stats:
+            st.caption(
+                f"Response cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                f"{cache_stats.get('near_duplicate_hits', 0)} near-duplicate reuses, ~{cache_stats['saved_seconds']:.1f}s saved"
+            )
+        st.markdown('</div>', unsafe_allow_html=True)
+
+@timed_fragment("suggestions")
+def suggestions():
+    improvement = st.session_state.pop("pending_improvement", None)
+    if improvement and st.session_state.get("email_text"):
+        spinner_text = "Asking Groq for detailed suggestions..." if improvement["deep"] else "Analyzing and suggesting improvements..."
+        with st.spinner(spinner_text):
+            email_text = st.session_state.email_text
+            prefetched = None
+            if not improvement["deep"] and prefetcher:
+                # Reuse (or wait briefly for) the background fetch started when the draft appeared
+                prefetched = prefetcher.get(email_text, timeout=DEFAULT_PREFETCH_WAIT_SECONDS)
+            st.session_state.suggestions = st.session_state.generator.improve_email(
+                email_text, deep=improvement["deep"], prefetched=prefetched
+            )
+    if st.session_state.get("suggestions"):
+        st.markdown('<div class="result-card">', unsafe_allow_html=True)
+        st.markdown('<h3>Suggested Improvements</h3>', unsafe_allow_html=True)
+        st.write(st.session_state.suggestions)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+email_form()
+results()
+suggestions()
+
+# --- PERFORMANCE STATS (optional) ---
+if st.sidebar.checkbox("Show performance stats", value=False):
+    st.sidebar.subheader("LLM call stats")
+    snapshot = get_metrics().snapshot()
+    if not snapshot:
+        st.sidebar.caption("No Groq calls recorded yet.")
+    for label, entry in snapshot.items():
+        st.sidebar.markdown(f"**{label}** — {entry['requests']} calls")
+        latency = entry.get("request_latency", {})
+        ttft = entry.get("time_to_first_token", {})
+        queue = entry.get("queue_wait", {})
+        tps = entry.get("output_tokens_per_second", {})
+        st.sidebar.caption(
+            f"latency p50 {latency.get('p50', 0)}s / p95 {latency.get('p95', 0)}s · "
+            f"TTFT p50 {ttft.get('p50', 0)}s · queue p95 {queue.get('p95', 0)}s · "
+            f"{tps.get('mean', 0)} tok/s · tokens {entry['prompt_tokens_total']} in / {entry['completion_tokens_total']} out"
+        )
+        if entry["errors"]:
+            st.sidebar.caption(f"errors: {entry['errors']}")
+        if entry["finish_reasons"]:
+            st.sidebar.caption(f"finish reasons: {entry['finish_reasons']}")
+    if st.session_state.generator:
+        scheduler_stats = st.session_state.generator.scheduler.stats()
+        queues = scheduler_stats.pop("priorities")
+        st.sidebar.caption(f"Scheduler: {scheduler_stats}")
+        st.sidebar.caption("Queues: " + " · ".join(
+            f"{priority} {queue['waiting']} waiting / {queue['in_flight']} in flight, wait p95 {queue['queue_wait_p95']}s"
+            for priority, queue in queues.items()
+        ))
+        router_stats = st.session_state.generator.router.stats()
+        st.sidebar.caption(
+            f"Routing across {', '.join(router_stats['models'])}: "
+            f"{router_stats['hedged']} hedged, {router_stats['hedge_wins']} won by the hedge"
+        )
+    with st.sidebar.expander("Prometheus metrics"):
+        st.code(get_metrics().render_prometheus(), language="")
+
+# --- EXPANDABLE SECTIONS ---
+@timed_fragment("template_picker")
+def template_picker():
+    template_selection = st.selectbox("Select a template", list(TEMPLATES))
+    st.text_area(f"{template_selection} Template", value=TEMPLATES[template_selection], height=150,
+                 key=f"template_text_{template_selection}")
+    st.button("Use This Template", on_click=use_template, args=(template_selection,))
 
-# --- EXPANDABLE SECTIONS (No changes in logic) ---
 with st.expander("Need inspiration? Try a template"):
-    templates = {
-        "Job Application": "I am writing to apply for the [Position] role advertised on [Platform]. With my experience in [Relevant Skills], I believe I am well-suited for this position. I have attached my resume and portfolio. I am particularly interested in this role because [Reason]. I would appreciate the opportunity to discuss my application further.",
-        "Meeting Request": "I would like to schedule a meeting to discuss [Topic]. This is important because [Reason]. I am available on [Dates/Times]. The meeting should take approximately [Duration]. Please let me know what works best for your schedule.",
-        "Thank You": "I wanted to express my sincere gratitude for [What They Did]. Your help with [Specific Action] was invaluable and [Positive Impact]. I truly appreciate your time and support. If there's ever anything I can do to return the favor, please don't hesitate to let me know.",
-        "Follow-up": "I am writing to follow up on [Previous Communication/Meeting]. As discussed, [Reminder of Key Points]. I wanted to check in on [Next Steps/Decision]. Please let me know if you need any additional information from me to move forward."
-    }
-    template_selection = st.selectbox("Select a template", list(templates.keys()))
-    template_text = st.text_area(f"{template_selection} Template", value=templates[template_selection], height=150)
-    if st.button("Use This Template"):
-        st.session_state["key_points_template"] = template_text
-        st.rerun()
+    template_picker()
 
 with st.expander("Email Writing Tips"):
-    st.markdown("""
-        <h3 style="color: #1565c0;">💡 Tips for Writing Effective Emails</h3>
-        <ul style="line-height:1.7; font-size: 16px;">
-            <li>✍️ <b>Be specific</b> about your purpose and desired outcome.</li>
-            <li>📌 <b>List key points</b> or details for inclusion.</li>
-            <li>🎭 <b>Define the tone</b> (formal, friendly, persuasive, etc.).</li>
-            <li>👤 <b>Mention the recipient</b> and their role.</li>
-            <li>📖 <b>Provide context</b> or background if helpful.</li>
-            <li>📏 <b>Choose the right length</b> for your message.</li>
-            <li>🔍 <b>Review & personalize</b> the draft before sending.</li>
-            <li>🔒 <b>Avoid sensitive information</b> like passwords.</li>
-        </ul>
-    """, unsafe_allow_html=True)
+    st.markdown(TIPS_HTML, unsafe_allow_html=True)
 
 with st.expander("Contact the Owner | Feedback & Suggestions"):
-    st.markdown("""
-        <h4 style="margin-top:0;">👤 App Owner</h4>
-        <p><b>Name:</b> Khushbu Sharma<br>
-           <b>Email:</b> <a href="mailto:khushbu.sharma7105@gmail.com">khushbu.sharma7105@gmail.com</a></p>
-        <p>We welcome your feedback and suggestions! Please feel free to reach out with any issues, feature requests, or ideas.</p>
-    """, unsafe_allow_html=True)
+    st.markdown(CONTACT_HTML, unsafe_allow_html=True)
 
 # --- FOOTER ---
 st.markdown(f"""
@@ -324,3 +308,9 @@ st.markdown(f"""
     <p><b>AI Email Assistant</b> &mdash; Your personal email writing tool &copy; {time.strftime('%Y')}</p>
 </div>
 """, unsafe_allow_html=True)
+
+# --- DEBUG: RERUN TIMES ---
+if st.sidebar.checkbox("Debug mode", key="debug_mode", help="Show how long each rerun takes."):
+    st.sidebar.caption(f"Full rerun: {(time.perf_counter() - run_started) * 1000:.1f} ms")
+    for key, elapsed_ms in st.session_state.get("rerun_times", {}).items():
+        st.sidebar.caption(f"Last {key} rerun: {elapsed_ms:.1f} ms")
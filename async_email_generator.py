@@ -0,0 +1,324 @@
+import os
+import time
+import asyncio
+import logging
+from groq import AsyncGroq
+from dotenv import load_dotenv
+from response_cache import ResponseCache, make_cache_key
+from request_scheduler import PRIORITY_BULK, PRIORITY_INTERACTIVE, get_shared_scheduler
+from prompt_builder import PromptBuilder, estimate_message_tokens
+from email_generator import IMPROVE_MAX_TOKENS, MAX_CONTINUATIONS
+from token_budget import get_token_budget, max_tokens_for_length
+from single_flight import AsyncSingleFlight
+from email_analyzer import DEFAULT_SCORE_THRESHOLD, analyze_email, format_findings
+from similarity_index import SimilarityIndex
+from model_registry import ModelRegistry
+from model_router import DEFAULT_MODELS, configured_models
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_BATCH_CONCURRENCY = 8
+EMAIL_REQUEST_FIELDS = ("key_points", "recipient", "sender", "purpose", "tone", "length")
+
+
+class AsyncEmailGenerator:
+    """asyncio counterpart of EmailGenerator built on the async Groq client."""
+
+    def __init__(self, use_cache=True, cache=None, concurrency=DEFAULT_BATCH_CONCURRENCY, scheduler=None,
+                 similarity_index=None, token_budget=None, analysis_threshold=DEFAULT_SCORE_THRESHOLD, models=None):
+        self.api_key = os.getenv("GROQ_API_KEY")
+        if not self.api_key:
+            raise ValueError("GROQ_API_KEY not found in .env file. Please get a key from https://console.groq.com/keys")
+
+        try:
+            self.client = AsyncGroq(api_key=self.api_key, max_retries=0)
+            # Same choice as EmailGenerator: models= or GROQ_MODELS, else the fastest model in the
+            # registry file (read only; EmailGenerator and api_test.py refresh it), else the default
+            registry = ModelRegistry(self.client)
+            self.model_name = (list(models or configured_models()) or registry.ranked() or DEFAULT_MODELS)[0]
+            logging.info(f"Async Groq client configured successfully (model: {self.model_name}).")
+        except Exception as e:
+            raise RuntimeError(f"Failed to configure async Groq client: {e}")
+
+        if cache is not None:
+            self.cache = cache
+        elif use_cache:
+            self.cache = ResponseCache()
+        else:
+            self.cache = None
+        if similarity_index is not None:
+            self.similar = similarity_index
+        elif use_cache:
+            self.similar = SimilarityIndex()
+        else:
+            self.similar = None
+        self.analysis_threshold = analysis_threshold
+        self.concurrency = concurrency
+        self.scheduler = scheduler or get_shared_scheduler()
+        self.prompts = PromptBuilder()
+        self.budgets = token_budget or get_token_budget()
+        self._flights = AsyncSingleFlight()
+
+    async def _create_completion(self, messages, max_tokens, method, priority=PRIORITY_INTERACTIVE, **kwargs):
+        """Sends a chat completion through the shared rate-limit-aware scheduler."""
+        return await self.scheduler.execute_async(
+            lambda: self.client.chat.completions.with_raw_response.create(
+                messages=messages, model=self.model_name, max_tokens=max_tokens, **kwargs
+            ),
+            estimated_tokens=estimate_message_tokens(messages, max_tokens),
+            method=method,
+            model=self.model_name,
+            priority=priority,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes the underlying HTTP connection pool."""
+        await self.client.close()
+
+    async def generate_email(self, key_points, recipient, sender, purpose, tone, length, use_cache=True,
+                             priority=PRIORITY_INTERACTIVE):
+        """Generate an email using the Groq Llama 3 model.
+
+        A near-duplicate of an earlier request reuses that draft with the names swapped.
+        Identical concurrent requests share one upstream call.
+        """
+        max_tokens = self.budgets.max_tokens(purpose, length)
+        messages, _ = self.prompts.email_messages(key_points, recipient, sender, purpose, tone, length)
+        fields = dict(key_points=key_points, recipient=recipient, sender=sender, purpose=purpose, tone=tone, length=length)
+        if not use_cache:
+            return await self._complete_email(messages, max_tokens, None, fields, priority)
+        request_key = make_cache_key(
+            "generate", self.model_name, max_tokens_for_length(length),
+            key_points=key_points, recipient=recipient, sender=sender,
+            purpose=purpose, tone=tone, length=length,
+        )
+        if self.cache:
+            cached = self.cache.get(request_key)
+            if cached is not None:
+                return cached
+        if self.similar is not None:
+            match = self.similar.lookup(**fields)
+            if match:
+                return match[0]
+        # Flights are per priority: an interactive call must never wait behind a queued bulk leader
+        return await self._flights.do(
+            (request_key, priority), lambda: self._complete_email(messages, max_tokens, request_key, fields, priority)
+        )
+
+    async def _complete_email(self, messages, max_tokens, request_key, fields, priority=PRIORITY_INTERACTIVE):
+        try:
+            started = time.perf_counter()
+            chat_completion = await self._create_completion(messages, max_tokens, "generate_email", priority)
+            generated_text = chat_completion.choices[0].message.content or ""
+            finish_reason = chat_completion.choices[0].finish_reason
+            completion_tokens = getattr(chat_completion.usage, "completion_tokens", 0) or 0
+            purpose, length = fields["purpose"], fields["length"]
+            for _ in range(MAX_CONTINUATIONS):
+                if finish_reason != "length":
+                    break
+                chat_completion = await self._create_completion(
+                    self.prompts.continuation_messages(messages, generated_text),
+                    self.budgets.continuation_tokens(purpose, length), "continue_email", priority,
+                )
+                generated_text += chat_completion.choices[0].message.content or ""
+                finish_reason = chat_completion.choices[0].finish_reason
+                completion_tokens += getattr(chat_completion.usage, "completion_tokens", 0) or 0
+            self.budgets.observe(purpose, length, completion_tokens)
+            if request_key and self.cache and generated_text:
+                self.cache.set(request_key, generated_text, latency=time.perf_counter() - started)
+            if request_key and self.similar is not None and generated_text:
+                self.similar.add(email_text=generated_text, **fields)
+            return generated_text
+        except Exception as e:
+            logging.error(f"Error during email generation: {e}")
+            raise Exception(f"Failed to generate email using Groq. Error: {e}")
+
+    async def generate_email_stream(self, key_points, recipient, sender, purpose, tone, length, use_cache=True):
+        """Async generator counterpart of generate_email, yielding text chunks as Groq produces them.
+
+        A cached or near-duplicate draft is yielded as a single chunk; a draft cut off at its
+        token limit is continued in the same stream of chunks.
+        """
+        max_tokens = self.budgets.max_tokens(purpose, length)
+        messages, _ = self.prompts.email_messages(key_points, recipient, sender, purpose, tone, length)
+        fields = dict(key_points=key_points, recipient=recipient, sender=sender, purpose=purpose, tone=tone, length=length)
+        request_key = None
+        if use_cache:
+            request_key = make_cache_key(
+                "generate", self.model_name, max_tokens_for_length(length),
+                key_points=key_points, recipient=recipient, sender=sender,
+                purpose=purpose, tone=tone, length=length,
+            )
+            cached = self.cache.get(request_key) if self.cache else None
+            if cached is not None:
+                yield cached
+                return
+            if self.similar is not None:
+                match = self.similar.lookup(**fields)
+                if match:
+                    yield match[0]
+                    return
+
+        started = time.perf_counter()
+        parts = []
+        completion_tokens = 0
+        segment_messages, method = messages, "generate_email_stream"
+        for continuation in range(MAX_CONTINUATIONS + 1):
+            if continuation:
+                segment_messages = self.prompts.continuation_messages(messages, "".join(parts))
+                max_tokens = self.budgets.continuation_tokens(purpose, length)
+                method = "continue_email_stream"
+            finish_reason, usage = None, None
+            async for text, finish_reason, usage in self._stream_segment(segment_messages, max_tokens, method):
+                if text:
+                    parts.append(text)
+                    yield text
+            completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            if finish_reason != "length":
+                break
+        self.budgets.observe(purpose, length, completion_tokens)
+
+        generated_text = "".join(parts)
+        if request_key and self.cache and generated_text:
+            self.cache.set(request_key, generated_text, latency=time.perf_counter() - started)
+        if request_key and self.similar is not None and generated_text:
+            self.similar.add(email_text=generated_text, **fields)
+
+    async def _stream_segment(self, messages, max_tokens, method):
+        """Streams one completion, yielding (text, finish_reason, usage); the last item has no text."""
+        try:
+            stream, done = await self.scheduler.open_stream_async(
+                lambda: self.client.chat.completions.with_raw_response.create(
+                    messages=messages, model=self.model_name, max_tokens=max_tokens, stream=True
+                ),
+                estimated_tokens=estimate_message_tokens(messages, max_tokens),
+                method=method,
+                model=self.model_name,
+            )
+        except Exception as e:
+            logging.error(f"Error during email generation: {e}")
+            raise Exception(f"Failed to generate email using Groq. Error: {e}")
+
+        usage = None
+        finish_reason = None
+        first_token_at = None
+        error = None
+        try:
+            async for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None):
+                    usage = x_groq.usage
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                text = chunk.choices[0].delta.content
+                if text:
+                    first_token_at = first_token_at or time.perf_counter()
+                    yield text, finish_reason, usage
+            # Usage arrives on the last chunk, after the final text
+            yield None, finish_reason, usage
+        except BaseException as e:
+            error = e
+            if isinstance(e, Exception):
+                logging.error(f"Error while streaming email: {e}")
+                raise Exception(f"Failed to generate email using Groq. Error: {e}")
+            raise
+        finally:
+            await stream.close()
+            done(usage, finish_reason, first_token_at, error)
+
+    async def improve_email(self, email_text, use_cache=True, deep=False):
+        """Suggest improvements for an email.
+
+        Local checks answer instantly; Groq is only asked when deep=True or the draft
+        scores below analysis_threshold.
+        """
+        report = analyze_email(email_text)
+        quick = format_findings(report)
+        if not deep and report["score"] >= self.analysis_threshold:
+            return quick
+        try:
+            suggestions = await self._suggestions(email_text, use_cache)
+        except Exception as e:
+            logging.error(f"Error during email improvement: {e}")
+            suggestions = f"Failed to get suggestions. Error: {e}"
+        return f"{quick}\n\n{suggestions}" if report["findings"] else suggestions
+
+    async def _suggestions(self, email_text, use_cache):
+        if not use_cache:
+            return await self._complete_suggestions(email_text, None)
+        request_key = make_cache_key("improve", self.model_name, IMPROVE_MAX_TOKENS, email_text=email_text)
+        if self.cache:
+            cached = self.cache.get(request_key)
+            if cached is not None:
+                return cached
+        return await self._flights.do(
+            (request_key, PRIORITY_INTERACTIVE), lambda: self._complete_suggestions(email_text, request_key)
+        )
+
+    async def _complete_suggestions(self, email_text, request_key):
+        started = time.perf_counter()
+        chat_completion = await self._create_completion(
+            self.prompts.improve_messages(email_text)[0], IMPROVE_MAX_TOKENS, "improve_email"
+        )
+        suggestions = chat_completion.choices[0].message.content
+        if request_key and self.cache and suggestions:
+            self.cache.set(request_key, suggestions, latency=time.perf_counter() - started)
+        return suggestions
+
+    async def generate_emails_batch(self, requests, concurrency=None, cancel_event=None, use_cache=True,
+                                    priority=PRIORITY_BULK):
+        """Generate many emails concurrently and return one result per request, in input order.
+
+        Each request is a dict with the generate_email fields. Each result is a dict with
+        "index", "email" and "error"; a failing request does not affect the others.
+        At most `concurrency` requests are in flight at once. Setting `cancel_event` stops
+        new requests from starting (they are reported as cancelled); cancelling the awaiting
+        task cancels every in-flight request. Batches run at bulk priority by default, behind
+        interactive calls sharing the scheduler.
+        """
+        requests = list(requests)
+        concurrency = max(1, concurrency or self.concurrency)
+        results = [None] * len(requests)
+        next_index = 0
+
+        async def worker():
+            nonlocal next_index
+            while next_index < len(requests):
+                index = next_index
+                next_index += 1
+                if cancel_event is not None and cancel_event.is_set():
+                    results[index] = {"index": index, "email": None, "error": "Cancelled before start"}
+                    continue
+                request = requests[index]
+                try:
+                    missing = [name for name in EMAIL_REQUEST_FIELDS if name not in request]
+                    if missing:
+                        raise ValueError(f"Request is missing fields: {', '.join(missing)}")
+                    fields = {name: request[name] for name in EMAIL_REQUEST_FIELDS}
+                    email_text = await self.generate_email(**fields, use_cache=use_cache, priority=priority)
+                    results[index] = {"index": index, "email": email_text, "error": None}
+                except Exception as e:
+                    results[index] = {"index": index, "email": None, "error": str(e)}
+
+        started = time.perf_counter()
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(requests)))]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+
+        failures = sum(1 for result in results if result["error"])
+        logging.info(
+            f"Batch of {len(requests)} emails finished in {time.perf_counter() - started:.2f}s "
+            f"({failures} failed, concurrency {concurrency})."
+        )
+        return results
@@ -0,0 +1,233 @@
+"""Offline performance benchmark for EmailGenerator against a local fake Groq server.
+
+Usage:
+    python benchmark.py                                  # run and print JSON results
+    python benchmark.py --baseline benchmark_baseline.json   # fail on regressions
+    python benchmark.py --update-baseline benchmark_baseline.json
+
+No API key or network access is needed; every call goes to fake_groq_server.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from fake_groq_server import FakeGroqConfig, FakeGroqProcess
+from metrics import percentile
+from email_generator import EmailGenerator
+from async_email_generator import AsyncEmailGenerator
+from request_scheduler import PRIORITY_BULK, RequestScheduler
+
+SCENARIOS = ("generate_email", "improve_email", "generate_email_stream", "generate_emails_batch", "priority_mix")
+DEFAULT_TOLERANCE = 0.25
+# Absolute slack so sub-10ms jitter on fast runs does not trip the relative check
+LATENCY_SLACK_SECONDS = 0.02
+
+
+def _requests(count):
+    lengths = ("Short", "Medium", "Long")
+    return [
+        {
+            "key_points": f"Confirm the agenda for meeting {i}. Share the slides beforehand. Ask about budget item {i % 7}.",
+            "recipient": f"Recipient {i}",
+            "sender": "Benchmark Bot",
+            "purpose": "Meeting Request",
+            "tone": "Professional",
+            "length": lengths[i % len(lengths)],
+        }
+        for i in range(count)
+    ]
+
+
+def _summarize(latencies, errors, elapsed, ttfts=None):
+    summary = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p95": round(percentile(latencies, 95), 4),
+        "latency_p99": round(percentile(latencies, 99), 4),
+    }
+    if ttfts:
+        summary["ttft_p50"] = round(percentile(ttfts, 50), 4)
+        summary["ttft_p95"] = round(percentile(ttfts, 95), 4)
+    return summary
+
+
+def _run_threaded(call, items, concurrency):
+    latencies, ttfts, errors = [], [], 0
+
+    def timed(item):
+        started = time.perf_counter()
+        first_token = call(item)
+        finished = time.perf_counter()
+        return finished - started, (first_token - started) if first_token else None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(timed, item) for item in items]
+        for future in futures:
+            try:
+                latency, ttft = future.result()
+                latencies.append(latency)
+                if ttft is not None:
+                    ttfts.append(ttft)
+            except Exception:
+                errors += 1
+    return _summarize(latencies, errors, time.perf_counter() - started, ttfts)
+
+
+def run_benchmark(requests=120, concurrency=16, latency=0.05, tokens_per_second=1500.0,
+                  error_rate=0.0, rate_limit_rate=0.0, scenarios=SCENARIOS):
+    """Runs each scenario against a fake server in a child process and returns a JSON-serialisable report."""
+    config = FakeGroqConfig(latency=latency, tokens_per_second=tokens_per_second,
+                            error_rate=error_rate, rate_limit_rate=rate_limit_rate)
+    report = {
+        "config": {
+            "requests": requests, "concurrency": concurrency, "latency": latency,
+            "tokens_per_second": tokens_per_second, "error_rate": error_rate, "rate_limit_rate": rate_limit_rate,
+        },
+        "scenarios": {},
+    }
+    with FakeGroqProcess(config=config) as server:
+        # The Groq clients read the base URL when they are constructed
+        os.environ["GROQ_BASE_URL"] = server.base_url
+        os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+        def scheduler():
+            return RequestScheduler(requests_per_minute=10 ** 7, tokens_per_minute=10 ** 9,
+                                    max_concurrency=concurrency, base_delay=0.05)
+
+        items = _requests(requests)
+        # Pinning the model keeps the benchmark from probing the fake server and touching the model registry
+        generator = EmailGenerator(use_cache=False, scheduler=scheduler(), models=config.models)
+
+        if "generate_email" in scenarios:
+            report["scenarios"]["generate_email"] = _run_threaded(
+                lambda item: generator.generate_email(**item, use_cache=False) and None, items, concurrency
+            )
+
+        if "improve_email" in scenarios:
+            generator.scheduler = scheduler()
+            draft = "Subject: Agenda\n\nDear team,\n\nPlease review the attached agenda before Monday.\n\nBest regards,\nBot"
+            report["scenarios"]["improve_email"] = _run_threaded(
+                lambda item: generator.request_suggestions(f"{draft} ({item['recipient']})", use_cache=False) and None,
+                items, concurrency,
+            )
+
+        if "generate_email_stream" in scenarios:
+            generator.scheduler = scheduler()
+
+            def stream(item):
+                first_token = None
+                for _ in generator.generate_email_stream(**item, use_cache=False):
+                    first_token = first_token or time.perf_counter()
+                return first_token
+
+            report["scenarios"]["generate_email_stream"] = _run_threaded(stream, items, concurrency)
+
+        if "generate_emails_batch" in scenarios:
+            async def batch():
+                async with AsyncEmailGenerator(use_cache=False, scheduler=scheduler()) as async_generator:
+                    started = time.perf_counter()
+                    results = await async_generator.generate_emails_batch(items, concurrency=concurrency)
+                    elapsed = time.perf_counter() - started
+                errors = sum(1 for result in results if result["error"])
+                return {
+                    "requests": len(results),
+                    "errors": errors,
+                    "elapsed_seconds": round(elapsed, 3),
+                    "throughput_rps": round((len(results) - errors) / elapsed, 2),
+                }
+
+            report["scenarios"]["generate_emails_batch"] = asyncio.run(batch())
+
+        if "priority_mix" in scenarios:
+            # Interactive calls arriving while a bulk job oversubscribes the same scheduler;
+            # latency figures are for the interactive calls
+            generator.scheduler = scheduler()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency * 2) as bulk_pool:
+                bulk = [
+                    bulk_pool.submit(generator.generate_email, **item, use_cache=False, priority=PRIORITY_BULK)
+                    for item in items
+                ]
+                interactive = _run_threaded(
+                    lambda item: generator.generate_email(**item, use_cache=False) and None,
+                    items[:max(1, requests // 4)], 2,
+                )
+                bulk_errors = sum(1 for future in bulk if future.exception() is not None)
+            interactive["bulk_throughput_rps"] = round((len(bulk) - bulk_errors) / (time.perf_counter() - started), 2)
+            report["scenarios"]["priority_mix"] = interactive
+
+        report["upstream_requests"] = httpx.get(f"{server.base_url}/stats").json()["requests"]
+    return report
+
+
+def compare_to_baseline(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Returns a list of human-readable regressions versus a stored baseline report."""
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        current = report["scenarios"].get(name)
+        if current is None:
+            continue
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {current['throughput_rps']} rps < baseline {base['throughput_rps']} rps")
+        for key in ("latency_p50", "latency_p95", "latency_p99", "ttft_p95"):
+            if base.get(key) and current.get(key, 0) > base[key] * (1 + tolerance) + LATENCY_SLACK_SECONDS:
+                regressions.append(f"{name}: {key} {current[key]}s > baseline {base[key]}s")
+        if current["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {current['errors']} errors > baseline {base.get('errors', 0)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark EmailGenerator against a local fake Groq server.")
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server time to first token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=1500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Run only these scenarios")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="Fail if results regress versus this baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed relative regression")
+    parser.add_argument("--update-baseline", metavar="PATH", help="Write the results as the new baseline")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.ERROR)
+    report = run_benchmark(
+        requests=args.requests, concurrency=args.concurrency, latency=args.latency,
+        tokens_per_second=args.tokens_per_second, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, scenarios=args.scenario or SCENARIOS,
+    )
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.update_baseline:
+        with open(args.update_baseline, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("Warning: baseline was recorded with a different configuration.", file=sys.stderr)
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print("Performance regressions detected:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  - {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("No performance regressions versus baseline.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
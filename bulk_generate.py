@@ -0,0 +1,270 @@
+"""Bulk email generation from a JSONL or CSV file of requests.
+
+Usage:
+    python bulk_generate.py requests.jsonl --output emails.jsonl --workers 8
+
+Each input record needs `key_points`, `recipient` and `sender`; `purpose`, `tone` and
+`length` fall back to the defaults below. Results are appended to the output JSONL as
+they complete and progress is checkpointed next to it, so re-running the same command
+after an interruption resumes where the previous run stopped. Records that failed upstream
+(marked "retryable") are tried again on the next run; a later row for the same index
+supersedes the earlier one. Invalid records are reported once and not retried.
+"""
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email_generator import EmailGenerator
+from request_scheduler import PRIORITY_BULK
+from metrics import percentile
+
+DEFAULT_FIELDS = {"purpose": "Other", "tone": "Professional", "length": "Medium"}
+REQUIRED_FIELDS = ("key_points", "recipient", "sender")
+CHECKPOINT_EVERY = 50
+LATENCY_SAMPLE_SIZE = 10000
+
+
+def read_records(path, file_format=None):
+    """Yields (index, record) pairs from a JSONL or CSV file without loading it into memory."""
+    file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            for index, row in enumerate(csv.DictReader(f)):
+                yield index, row
+        else:
+            index = 0
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield index, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield index, {"__parse_error": str(e)}
+                index += 1
+
+
+def _truncate_partial_line(path, chunk_size=64 * 1024):
+    """Cuts a half-written last line (from a killed run) so the next result starts on a fresh line."""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - chunk_size)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                keep = start + newline + 1
+                break
+            position = start
+        else:
+            keep = 0
+        if keep < end:
+            f.truncate(keep)
+
+
+class Checkpoint:
+    """Tracks completed record indices as a contiguous watermark plus a small set above it."""
+
+    def __init__(self, path):
+        self.path = path
+        self.watermark = 0
+        self.done_above = set()
+        self.output_offset = 0
+
+    def load(self, output_path):
+        """Restores progress from the checkpoint file and any output written after it."""
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.watermark = state["watermark"]
+            self.done_above = set(state["done_above"])
+            self.output_offset = state["output_offset"]
+        if os.path.exists(output_path):
+            _truncate_partial_line(output_path)
+            # Results flushed after the last checkpoint write still count as done
+            with open(output_path, "rb") as f:
+                f.seek(self.output_offset)
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                        if not row.get("retryable"):
+                            self.mark_done(row["index"])
+                    except (ValueError, KeyError, AttributeError):
+                        continue
+            self.output_offset = os.path.getsize(output_path)
+
+    def is_done(self, index):
+        return index < self.watermark or index in self.done_above
+
+    def mark_done(self, index):
+        self.done_above.add(index)
+        while self.watermark in self.done_above:
+            self.done_above.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self, output_offset):
+        """Atomically writes the current progress."""
+        self.output_offset = output_offset
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "watermark": self.watermark,
+                "done_above": sorted(self.done_above),
+                "output_offset": output_offset,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+
+class RunStats:
+    """Collects throughput, latency percentiles and failure counts for a run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.completed = 0
+        self.failed = 0
+        self.retryable = 0
+        self.skipped = 0
+        self.latencies = []
+        self._seen = 0
+
+    def record(self, latency, ok, retryable=False):
+        self.completed += 1
+        if not ok:
+            self.failed += 1
+        if retryable:
+            self.retryable += 1
+        # Reservoir sampling keeps memory flat on very large runs
+        self._seen += 1
+        if len(self.latencies) < LATENCY_SAMPLE_SIZE:
+            self.latencies.append(latency)
+        else:
+            slot = random.randrange(self._seen)
+            if slot < LATENCY_SAMPLE_SIZE:
+                self.latencies[slot] = latency
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "processed": self.completed,
+            "failed": self.failed,
+            "retryable": self.retryable,
+            "skipped_from_checkpoint": self.skipped,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_per_minute": round(self.completed / elapsed * 60, 1) if elapsed else 0.0,
+            "latency_p50": round(percentile(self.latencies, 50), 3),
+            "latency_p95": round(percentile(self.latencies, 95), 3),
+            "latency_p99": round(percentile(self.latencies, 99), 3),
+        }
+
+
+def generate_one(generator, index, record, use_cache):
+    """Generates the email for one record and returns its output row and latency."""
+    started = time.perf_counter()
+    result = {"index": index, "email": None, "error": None}
+    if "__parse_error" in record:
+        result["error"] = f"Invalid JSON record: {record['__parse_error']}"
+        return result, time.perf_counter() - started
+    missing = [name for name in REQUIRED_FIELDS if not record.get(name)]
+    if missing:
+        result["error"] = f"Record is missing fields: {', '.join(missing)}"
+        return result, time.perf_counter() - started
+    fields = {name: record[name] for name in REQUIRED_FIELDS}
+    for name, default in DEFAULT_FIELDS.items():
+        fields[name] = record.get(name) or default
+    try:
+        # Bulk priority: interactive requests sharing the scheduler go first
+        result["email"] = generator.generate_email(**fields, use_cache=use_cache, priority=PRIORITY_BULK)
+    except Exception as e:
+        # Failed even after the scheduler's retries (5xx, 429, timeout): left for the next run
+        result["error"] = str(e)
+        result["retryable"] = True
+    return result, time.perf_counter() - started
+
+
+def run(input_path, output_path, workers=8, file_format=None, use_cache=True, limit=None):
+    """Streams input records through EmailGenerator and appends results to output_path."""
+    checkpoint = Checkpoint(output_path + ".checkpoint.json")
+    checkpoint.load(output_path)
+    stats = RunStats()
+    generator = EmailGenerator(use_cache=use_cache)
+
+    pending = set()
+    since_checkpoint = 0
+    with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def drain(return_when):
+            nonlocal since_checkpoint
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                pending.discard(future)
+                result, latency = future.result()
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                if not result.get("retryable"):
+                    checkpoint.mark_done(result["index"])
+                stats.record(latency, result["error"] is None, result.get("retryable", False))
+                since_checkpoint += 1
+            out.flush()
+            if since_checkpoint >= CHECKPOINT_EVERY:
+                checkpoint.save(out.tell())
+                since_checkpoint = 0
+
+        try:
+            for index, record in read_records(input_path, file_format):
+                if limit is not None and index >= limit:
+                    break
+                if checkpoint.is_done(index):
+                    stats.skipped += 1
+                    continue
+                # Bound in-flight work so memory stays flat regardless of input size
+                if len(pending) >= workers * 2:
+                    drain(FIRST_COMPLETED)
+                pending.add(pool.submit(generate_one, generator, index, record, use_cache))
+            while pending:
+                drain(FIRST_COMPLETED)
+        except KeyboardInterrupt:
+            print("\nInterrupted; saving progress. Re-run the same command to resume.")
+            for future in pending:
+                future.cancel()
+            pending = {future for future in pending if not future.cancelled()}
+            while pending:
+                drain(FIRST_COMPLETED)
+            raise
+        finally:
+            out.flush()
+            checkpoint.save(out.tell())
+
+    return stats.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate emails in bulk from a JSONL or CSV file.")
+    parser.add_argument("input", help="Path to a .jsonl or .csv file of email requests")
+    parser.add_argument("--output", "-o", default="generated_emails.jsonl", help="Output JSONL path (appended to)")
+    parser.add_argument("--workers", "-w", type=int, default=8, help="Number of concurrent requests")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from file extension)")
+    parser.add_argument("--limit", type=int, help="Only process the first N records")
+    parser.add_argument("--no-cache", action="store_true", help="Always request fresh drafts")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    summary = run(
+        args.input, args.output, workers=args.workers, file_format=args.format,
+        use_cache=not args.no_cache, limit=args.limit,
+    )
+    print("\n=== Bulk generation summary ===")
+    print(f"Processed:   {summary['processed']} ({summary['failed']} failed, {summary['skipped_from_checkpoint']} already done)")
+    if summary["retryable"]:
+        print(f"Retry:       {summary['retryable']} upstream failures; re-run the same command to retry them")
+    print(f"Elapsed:     {summary['elapsed_seconds']}s")
+    print(f"Throughput:  {summary['throughput_per_minute']} emails/min")
+    print(f"Latency:     p50 {summary['latency_p50']}s | p95 {summary['latency_p95']}s | p99 {summary['latency_p99']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Instant local checks for email drafts, run before asking the LLM for suggestions.
+
+Usage:
+    python email_analyzer.py generated_emails.jsonl   # analyze every "email" in a bulk output file
+"""
+import os
+import re
+import sys
+import json
+import argparse
+from collections import Counter
+
+# Drafts scoring below this get LLM suggestions as well as the local findings
+DEFAULT_SCORE_THRESHOLD = int(os.getenv("EMAIL_ANALYSIS_THRESHOLD", "80"))
+LONG_SENTENCE_WORDS = 35
+REPEATED_PHRASE_WORDS = 4
+SIGN_OFF_WINDOW_LINES = 4
+
+SEVERITY_PENALTIES = {"error": 25, "warning": 10, "info": 3}
+SIGN_OFF_PATTERN = re.compile(
+    r"\b(regards|sincerely|thanks|thank you|best|cheers|respectfully|yours|warm wishes|kind wishes|all the best)\b",
+    re.IGNORECASE,
+)
+PLACEHOLDER_PATTERN = re.compile(r"\[[^\[\]\n]{1,60}\]")
+SUBJECT_PATTERN = re.compile(r"^\s*subject\s*:", re.IGNORECASE)
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]*")
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _finding(check, severity, message, details=None):
+    return {"check": check, "severity": severity, "message": message, "details": details or []}
+
+
+def _check_subject(lines):
+    if not any(SUBJECT_PATTERN.match(line) for line in lines[:3]):
+        return _finding("missing_subject", "error", 'Add a "Subject:" line at the top.')
+
+
+def _check_sign_off(lines):
+    if not any(SIGN_OFF_PATTERN.search(line) for line in lines[-SIGN_OFF_WINDOW_LINES:]):
+        return _finding("missing_sign_off", "warning", 'End with a closing such as "Best regards," and your name.')
+
+
+def _check_placeholders(text):
+    placeholders = sorted(set(PLACEHOLDER_PATTERN.findall(text)))
+    if placeholders:
+        return _finding(
+            "unfilled_placeholders", "error",
+            f"Replace the template placeholders: {', '.join(placeholders)}.", placeholders,
+        )
+
+
+def _check_long_sentences(text):
+    long_sentences = []
+    for sentence in _SENTENCE_PATTERN.findall(text):
+        words = sentence.split()
+        if len(words) > LONG_SENTENCE_WORDS:
+            long_sentences.append(" ".join(words[:8]) + " ...")
+    if long_sentences:
+        return _finding(
+            "long_sentences", "warning",
+            f"Split {len(long_sentences)} sentence(s) longer than {LONG_SENTENCE_WORDS} words.", long_sentences,
+        )
+
+
+def _check_repeated_phrases(text):
+    words = _WORD_PATTERN.findall(text.lower())
+    counts = Counter(
+        " ".join(words[i:i + REPEATED_PHRASE_WORDS]) for i in range(len(words) - REPEATED_PHRASE_WORDS + 1)
+    )
+    repeated = [phrase for phrase, count in counts.most_common(5) if count > 1]
+    if repeated:
+        return _finding(
+            "repeated_phrases", "info",
+            f"Reword repeated phrases: {', '.join(repr(phrase) for phrase in repeated)}.", repeated,
+        )
+
+
+def analyze_email(email_text):
+    """Runs every local check on one draft; returns {"score": 0-100, "findings": [...]}."""
+    lines = [line.strip() for line in email_text.strip().splitlines() if line.strip()]
+    findings = [
+        finding for finding in (
+            _check_subject(lines),
+            _check_placeholders(email_text),
+            _check_sign_off(lines),
+            _check_long_sentences(email_text),
+            _check_repeated_phrases(email_text),
+        )
+        if finding is not None
+    ]
+    score = max(0, 100 - sum(SEVERITY_PENALTIES[finding["severity"]] for finding in findings))
+    return {"score": score, "findings": findings}
+
+
+def analyze_batch(email_texts):
+    """Analyzes many drafts; returns one report per draft, in order."""
+    return [analyze_email(text) for text in email_texts]
+
+
+def format_findings(report):
+    """Renders a report as a markdown bullet list."""
+    if not report["findings"]:
+        return f"Quick checks passed (score {report['score']}/100)."
+    lines = [f"Quick checks (score {report['score']}/100):"]
+    lines.extend(f"- {finding['message']}" for finding in report["findings"])
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local email checks over a JSONL file of drafts.")
+    parser.add_argument("input", help='JSONL file whose records have an "email" field (e.g. bulk_generate output)')
+    parser.add_argument("--threshold", type=int, default=DEFAULT_SCORE_THRESHOLD, help="Report drafts scoring below this")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    drafts = [(record.get("index", i), record.get("email")) for i, record in enumerate(records) if record.get("email")]
+    reports = analyze_batch([text for _, text in drafts])
+    flagged = 0
+    for (index, _), report in zip(drafts, reports):
+        if report["score"] < args.threshold:
+            flagged += 1
+            print(json.dumps({"index": index, **report}))
+    print(f"{flagged} of {len(drafts)} drafts scored below {args.threshold}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,19 @@ import os
 from groq import Groq
 from dotenv import load_dotenv
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from response_cache import ResponseCache, make_cache_key
+from request_scheduler import PRIORITY_INTERACTIVE, get_shared_scheduler
+from prompt_builder import PromptBuilder, estimate_message_tokens, parse_variants
+from health_check import HealthProbe
+from single_flight import SingleFlight
+from similarity_index import SimilarityIndex
+from model_router import DEFAULT_MODELS, ModelRouter, configured_models
+from model_registry import ModelRegistry
+from token_budget import get_token_budget, max_tokens_for_length
+from email_analyzer import DEFAULT_SCORE_THRESHOLD, analyze_email, format_findings
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -9,108 +22,475 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Load environment variables
 load_dotenv()
 
+IMPROVE_MAX_TOKENS = 300
+# Continuations requested for one draft that keeps hitting its token limit
+MAX_CONTINUATIONS = 2
+MAX_VARIANTS = 6
+# Largest completion requested for several variants at once; bigger sets are generated in parallel
+MAX_VARIANT_BATCH_TOKENS = 4096
+VARIANT_HEADER_TOKENS = 16
+
+
+class _OpenedStream:
+    """A streaming completion that has been read up to its first content chunk."""
+
+    def __init__(self, model, stream, done, iterator, head, first_token_at):
+        self.model = model
+        self.stream = stream
+        self.done = done
+        self.iterator = iterator
+        self.head = head
+        self.first_token_at = first_token_at
+
+    def chunks(self):
+        return chain(self.head, self.iterator)
+
+    def close(self, usage=None, finish_reason=None, first_token_at=None, error=None):
+        self.stream.close()
+        self.done(usage, finish_reason, first_token_at, error)
+
+
 class EmailGenerator:
-    def __init__(self):
+    def __init__(self, use_cache=True, cache=None, scheduler=None, similarity_index=None, models=None,
+                 token_budget=None, analysis_threshold=DEFAULT_SCORE_THRESHOLD):
         self.api_key = os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in .env file. Please get a key from https://console.groq.com/keys")
         
         try:
-            self.client = Groq(api_key=self.api_key)
-            self.model_name = "llama-3.1-8b-instant" # Using Llama 3 via Groq
-            logging.info("Groq client configured successfully.")
+            # Retries are handled by the shared scheduler, so the SDK's own retries are disabled
+            self.client = Groq(api_key=self.api_key, max_retries=0)
+            # Pinned candidates come from models= or GROQ_MODELS; otherwise the registry's cached
+            # probe results pick the fastest models without a network round trip
+            self.registry = ModelRegistry(self.client)
+            pinned = list(models or configured_models())
+            self.router = ModelRouter(
+                pinned or self.registry.ranked() or DEFAULT_MODELS,
+                should_hedge=lambda: not self.scheduler.under_pressure(),
+            )
+            # The first candidate is the default and the health-check target
+            self.model_name = self.router.models[0]
+            logging.info(f"Groq client configured successfully (models: {', '.join(self.router.models)}).")
         except Exception as e:
             raise RuntimeError(f"Failed to configure Groq client: {e}")
 
+        # Identical form submits are served from the cache instead of a new Groq round trip
+        if cache is not None:
+            self.cache = cache
+        elif use_cache:
+            self.cache = ResponseCache()
+        else:
+            self.cache = None
+        # Requests whose key points differ by a word or two reuse an earlier draft
+        if similarity_index is not None:
+            self.similar = similarity_index
+        elif use_cache:
+            self.similar = SimilarityIndex()
+        else:
+            self.similar = None
+
+        # Every Groq call goes through one scheduler per process so pacing sees the whole quota
+        self.scheduler = scheduler or get_shared_scheduler()
+        self.registry.scheduler = self.scheduler
+        if not pinned:
+            self.registry.refresh_in_background(on_refresh=self.router.set_models)
+        self.prompts = PromptBuilder()
+        # Completion limits learned from real draft sizes, shared by every generator in the process
+        self.budgets = token_budget or get_token_budget()
+        # Drafts scoring at least this on the local checks do not need a Groq review
+        self.analysis_threshold = analysis_threshold
+        # Coalesces identical concurrent requests, e.g. a burst of submits of the same template
+        self._flights = SingleFlight()
+
+        # Shared by every session using this generator; probes without spending tokens
+        self.health = HealthProbe(self.client, self.model_name)
+
+    def _create_completion(self, messages, max_tokens, method, model=None, priority=PRIORITY_INTERACTIVE, **kwargs):
+        """Sends a chat completion through the shared rate-limit-aware scheduler."""
+        model = model or self.model_name
+        return self.scheduler.execute(
+            lambda: self.client.chat.completions.with_raw_response.create(
+                messages=messages, model=model, max_tokens=max_tokens, **kwargs
+            ),
+            estimated_tokens=estimate_message_tokens(messages, max_tokens),
+            method=method,
+            model=model,
+            priority=priority,
+        )
+
+    def _routed_completion(self, route, messages, max_tokens, method, priority=PRIORITY_INTERACTIVE):
+        """Sends a chat completion to the fastest candidate model, hedging if it runs late."""
+        return self.router.call(
+            route, lambda model: self._create_completion(messages, max_tokens, method, model=model, priority=priority)
+        )
+
+    def cache_stats(self):
+        """Returns response cache hit/miss counts, or None when caching is disabled."""
+        if not self.cache:
+            return None
+        stats = self.cache.stats()
+        if self.similar is not None:
+            stats["near_duplicate_hits"] = self.similar.hits
+        return stats
+
     def test_connection(self):
-        """Tests the connection to the Groq API."""
+        """Tests the connection to the Groq API with a fresh (token-free) health probe."""
         logging.info("Testing connection to Groq...")
-        try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": "Hello, world!"}],
-                model=self.model_name,
-                max_tokens=10,
-            )
-            if chat_completion.choices[0].message.content:
-                logging.info("✅ Groq connection successful!")
-                return True, f"Connected successfully to Groq ({self.model_name})"
-            else:
-                return False, "Connection test failed: Received an empty response."
-        except Exception as e:
-            logging.error(f"Groq connection error: {e}")
-            return False, f"Failed to connect to Groq. Please check your API key and internet connection. Error: {e}"
+        return self.health.check()
 
-    def generate_email(self, key_points, recipient, sender, purpose, tone, length):
-        """Generate an email using the Groq Llama 3 model."""
-        logging.info(f"Generating email with Groq ({self.model_name})...")
+    def _prepare_email_request(self, key_points, recipient, sender, purpose, tone, length, use_cache):
+        """Builds the chat messages, token limit and request key shared by the blocking and streaming paths.
 
-        if length == "Short":
-            max_tokens = 150
-        elif length == "Medium":
-            max_tokens = 300
-        else: # Long
-            max_tokens = 500
+        The request key identifies equivalent requests for the cache and in-flight coalescing;
+        it is None when the caller asked for a fresh draft. It uses the fixed per-length limit
+        so learned budgets do not invalidate cached drafts.
+        """
+        max_tokens = self.budgets.max_tokens(purpose, length)
+        request_key = self._email_request_key(
+            use_cache, key_points=key_points, recipient=recipient, sender=sender,
+            purpose=purpose, tone=tone, length=length,
+        )
+        messages, _ = self.prompts.email_messages(key_points, recipient, sender, purpose, tone, length)
+        return messages, max_tokens, request_key
 
-        system_prompt = "You are a professional AI assistant that drafts clear, well-structured, and courteous emails. Always begin with a concise and relevant subject line. Ensure the body of the email is complete, polite, and covers all requested details in a professional tone. Conclude every email with an appropriate closing and sign-off. Do not provide explanations, commentary, or incomplete messages—only the final email content."
+    def _email_request_key(self, use_cache, **fields):
+        if not use_cache:
+            return None
+        return make_cache_key("generate", self.model_name, max_tokens_for_length(fields["length"]), **fields)
 
-        user_prompt = f"""
-        # Write a {tone} email from {sender} to {recipient} about {purpose}.
-        # The email should be {length.lower()}.
-        
-        # Incorporate these key points:
-        # - {key_points}
-        Write a professional email with the following details:
+    def _cached(self, request_key):
+        if request_key and self.cache:
+            return self.cache.get(request_key)
+        return None
 
-        - Sender: {sender}
-        - Recipient: {recipient}
-        - Purpose of the email: {purpose}
-        - Tone: {tone}
-        - Key points to include: {key_points}
+    def _store(self, request_key, text, started):
+        if request_key and self.cache and text:
+            self.cache.set(request_key, text, latency=time.perf_counter() - started)
 
-        Begin with a clear subject line ("Subject: ...").
-        Structure the email to be well-organized, polite, and complete. Ensure all key points are included and the email ends with a proper closing/sign-off.
+    def _similar_draft(self, request_key, fields):
+        """Returns an adapted earlier draft for near-duplicate key points, or None."""
+        if request_key is None or self.similar is None:
+            return None
+        match = self.similar.lookup(**fields)
+        return match[0] if match else None
 
-        Generate only the full email content.
+    def _remember(self, request_key, fields, text):
+        if request_key is not None and self.similar is not None and text:
+            self.similar.add(email_text=text, **fields)
+        return text
+
+    def generate_email(self, key_points, recipient, sender, purpose, tone, length, use_cache=True,
+                       priority=PRIORITY_INTERACTIVE):
+        """Generate an email using the Groq Llama 3 model.
+
+        Set use_cache=False to skip the response cache and always get a fresh draft.
+        Background callers pass priority="bulk" so they only use capacity the UI leaves over.
+        A near-duplicate of an earlier request reuses that draft with the names swapped.
+        Identical concurrent requests share one upstream call.
         """
+        fields = dict(key_points=key_points, recipient=recipient, sender=sender, purpose=purpose, tone=tone, length=length)
+        messages, max_tokens, request_key = self._prepare_email_request(use_cache=use_cache, **fields)
+        cached = self._cached(request_key)
+        if cached is not None:
+            logging.info(f"Email served from cache ({self.cache.stats()['hits']} hits so far).")
+            return cached
+        similar = self._similar_draft(request_key, fields)
+        if similar is not None:
+            return similar
+        if request_key is None:
+            return self._complete_email(messages, max_tokens, None, purpose, length, priority)
+        # Flights are per priority: an interactive call must never wait behind a queued bulk leader
+        return self._flights.do(
+            (request_key, priority),
+            lambda: self._remember(
+                request_key, fields, self._complete_email(messages, max_tokens, request_key, purpose, length, priority)
+            ),
+        )
 
+    def _complete_email(self, messages, max_tokens, request_key, purpose, length, priority=PRIORITY_INTERACTIVE):
+        logging.info("Generating email with Groq...")
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                model=self.model_name,
-                max_tokens=max_tokens,
+            started = time.perf_counter()
+            chat_completion = self._routed_completion(
+                ("generate_email", length), messages, max_tokens, "generate_email", priority
             )
-            generated_text = chat_completion.choices[0].message.content
+            generated_text = chat_completion.choices[0].message.content or ""
+            finish_reason = chat_completion.choices[0].finish_reason
+            completion_tokens = getattr(chat_completion.usage, "completion_tokens", 0) or 0
+            for _ in range(MAX_CONTINUATIONS):
+                if finish_reason != "length":
+                    break
+                # Cut off at max_tokens: ask for the rest instead of regenerating the whole draft
+                logging.info("Draft hit its token limit; requesting a continuation.")
+                chat_completion = self._routed_completion(
+                    ("continue_email", length), self.prompts.continuation_messages(messages, generated_text),
+                    self.budgets.continuation_tokens(purpose, length), "continue_email", priority,
+                )
+                generated_text += chat_completion.choices[0].message.content or ""
+                finish_reason = chat_completion.choices[0].finish_reason
+                completion_tokens += getattr(chat_completion.usage, "completion_tokens", 0) or 0
+            self.budgets.observe(purpose, length, completion_tokens)
             logging.info("Email generated successfully.")
+            self._store(request_key, generated_text, started)
             return generated_text
         except Exception as e:
             logging.error(f"Error during email generation: {e}")
             raise Exception(f"Failed to generate email using Groq. Error: {e}")
 
-    def improve_email(self, email_text):
-        """Suggest improvements for an email using Groq."""
-        logging.info("Improving email with Groq...")
-        
-        prompt = f"""
-        Analyze the following email and provide 3-4 specific, actionable suggestions for how to improve it.
-        Focus on clarity, tone, and professionalism. Format your suggestions as a bulleted list.
+    def generate_email_stream(self, key_points, recipient, sender, purpose, tone, length, use_cache=True):
+        """Generate an email like generate_email, yielding text chunks as Groq produces them.
 
-        Email to analyze:
-        ---
-        {email_text}
-        ---
+        A cached or near-duplicate draft is yielded as a single chunk. The full text is cached
+        once the stream completes. A caller that arrives while an identical request is streaming
+        waits for it and receives the full text as one chunk.
+        """
+        fields = dict(key_points=key_points, recipient=recipient, sender=sender, purpose=purpose, tone=tone, length=length)
+        messages, max_tokens, request_key = self._prepare_email_request(use_cache=use_cache, **fields)
+        cached = self._cached(request_key)
+        if cached is not None:
+            logging.info("Email served from cache.")
+            yield cached
+            return
+        similar = self._similar_draft(request_key, fields)
+        if similar is not None:
+            yield similar
+            return
+        if request_key is None:
+            yield from self._stream_email(messages, max_tokens, None, purpose, length)
+            return
+
+        flight_key = (request_key, PRIORITY_INTERACTIVE)
+        flight, is_leader = self._flights.begin(flight_key)
+        if not is_leader:
+            logging.info("Joining an identical in-flight email request.")
+            yield self._flights.wait(flight)
+            return
+        generated_text = None
+        error = RuntimeError("The identical in-flight email request was cancelled.")
+        try:
+            generated_text = yield from self._stream_email(messages, max_tokens, request_key, purpose, length)
+            self._remember(request_key, fields, generated_text)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if generated_text is not None:
+                self._flights.finish(flight_key, flight, result=generated_text)
+            else:
+                self._flights.finish(flight_key, flight, error=error)
+
+    def _open_email_stream(self, messages, max_tokens, model, method="generate_email_stream"):
+        """Opens a stream on model and reads it up to the first content chunk.
 
-        Suggestions:
+        Hedged streams race on time to first token, so the opening read happens here.
         """
+        stream, done = self.scheduler.open_stream(
+            lambda: self.client.chat.completions.with_raw_response.create(
+                messages=messages, model=model, max_tokens=max_tokens, stream=True
+            ),
+            estimated_tokens=estimate_message_tokens(messages, max_tokens),
+            method=method,
+            model=model,
+        )
+        iterator = iter(stream)
+        head = []
         try:
-            chat_completion = self.client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=self.model_name,
-                max_tokens=300,
+            for chunk in iterator:
+                head.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    return _OpenedStream(model, stream, done, iterator, head, time.perf_counter())
+        except Exception as e:
+            stream.close()
+            done(error=e)
+            raise
+        return _OpenedStream(model, stream, done, iterator, head, None)
+
+    def _stream_segment(self, messages, max_tokens, route, method, parts, started):
+        """Streams one completion, appending its text to parts; returns (finish_reason, usage)."""
+        try:
+            opened = self.router.call(
+                route,
+                lambda model: self._open_email_stream(messages, max_tokens, model, method),
+                discard=lambda loser: loser.close(finish_reason="cancelled"),
             )
-            return chat_completion.choices[0].message.content
+        except Exception as e:
+            logging.error(f"Error during email generation: {e}")
+            raise Exception(f"Failed to generate email using Groq. Error: {e}")
+
+        first_token_at = opened.first_token_at
+        if first_token_at is not None:
+            logging.info(f"First token from {opened.model} after {first_token_at - started:.2f}s.")
+        usage = None
+        finish_reason = None
+        error = None
+        try:
+            for chunk in opened.chunks():
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None):
+                    usage = x_groq.usage
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                text = chunk.choices[0].delta.content
+                if text:
+                    first_token_at = first_token_at or time.perf_counter()
+                    parts.append(text)
+                    yield text
+        except Exception as e:
+            error = e
+            logging.error(f"Error while streaming email: {e}")
+            raise Exception(f"Failed to generate email using Groq. Error: {e}")
+        finally:
+            opened.close(usage, finish_reason, first_token_at, error)
+        return finish_reason, usage
+
+    def _stream_email(self, messages, max_tokens, request_key, purpose, length):
+        """Yields streamed chunks and returns the full text.
+
+        A draft cut off at its token limit is continued in the same stream of chunks.
+        """
+        logging.info("Streaming email from Groq...")
+        started = time.perf_counter()
+        parts = []
+        completion_tokens = 0
+        segment_messages, route, method = messages, ("generate_email_stream", length), "generate_email_stream"
+        for continuation in range(MAX_CONTINUATIONS + 1):
+            if continuation:
+                logging.info("Draft hit its token limit; streaming a continuation.")
+                segment_messages = self.prompts.continuation_messages(messages, "".join(parts))
+                max_tokens = self.budgets.continuation_tokens(purpose, length)
+                route, method = ("continue_email_stream", length), "continue_email_stream"
+            finish_reason, usage = yield from self._stream_segment(segment_messages, max_tokens, route, method, parts, started)
+            completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            if finish_reason != "length":
+                break
+        self.budgets.observe(purpose, length, completion_tokens)
+
+        generated_text = "".join(parts)
+        logging.info("Email streamed successfully.")
+        self._store(request_key, generated_text, started)
+        return generated_text
+
+    def generate_variants(self, key_points, recipient, sender, purpose, tones=("Professional",), lengths=("Medium",),
+                          use_cache=True, priority=PRIORITY_INTERACTIVE):
+        """Generate one email per (tone, length) combination, in a single Groq call where possible.
+
+        Returns a list of {"tone", "length", "email"} dicts in tones x lengths order. Cached and
+        near-duplicate drafts are reused; the rest are written together in one structured
+        completion, and any variant that cannot be parsed from it is generated separately,
+        in parallel.
+        """
+        variants = [(tone, length) for tone in tones for length in lengths]
+        if len(variants) > MAX_VARIANTS:
+            raise ValueError(f"At most {MAX_VARIANTS} variants can be generated at once.")
+        drafts = {}
+        missing = []
+        for i, (tone, length) in enumerate(variants):
+            fields = dict(key_points=key_points, recipient=recipient, sender=sender, purpose=purpose, tone=tone, length=length)
+            request_key = self._email_request_key(use_cache, **fields)
+            draft = self._cached(request_key)
+            if draft is None:
+                draft = self._similar_draft(request_key, fields)
+            if draft is None:
+                missing.append(i)
+            else:
+                drafts[i] = draft
+
+        if len(missing) > 1:
+            drafts.update(
+                self._batched_variants(key_points, recipient, sender, purpose, variants, missing, use_cache, priority)
+            )
+        remaining = [i for i in missing if i not in drafts]
+        if remaining:
+            with ThreadPoolExecutor(max_workers=len(remaining)) as pool:
+                futures = {
+                    i: pool.submit(
+                        self.generate_email, key_points, recipient, sender, purpose, *variants[i],
+                        use_cache=use_cache, priority=priority,
+                    )
+                    for i in remaining
+                }
+            for i, future in futures.items():
+                drafts[i] = future.result()
+        return [{"tone": tone, "length": length, "email": drafts[i]} for i, (tone, length) in enumerate(variants)]
+
+    def _batched_variants(self, key_points, recipient, sender, purpose, variants, indices, use_cache,
+                          priority=PRIORITY_INTERACTIVE):
+        """Requests the variants at indices in one completion; returns {index: draft} for those that parsed."""
+        subset = [variants[i] for i in indices]
+        max_tokens = sum(self.budgets.max_tokens(purpose, length) + VARIANT_HEADER_TOKENS for _, length in subset)
+        if max_tokens > MAX_VARIANT_BATCH_TOKENS:
+            return {}
+        messages, _ = self.prompts.variants_messages(key_points, recipient, sender, purpose, subset)
+        logging.info(f"Generating {len(subset)} email variants in one Groq call...")
+        try:
+            started = time.perf_counter()
+            chat_completion = self._routed_completion(
+                ("generate_variants", len(subset)), messages, max_tokens, "generate_variants", priority
+            )
+        except Exception as e:
+            logging.warning(f"Batched variant request failed ({e}); generating variants separately.")
+            return {}
+        parsed = parse_variants(chat_completion.choices[0].message.content or "", len(subset))
+        if chat_completion.choices[0].finish_reason == "length" and parsed:
+            # The last draft was cut off; it is regenerated on its own
+            parsed.pop(max(parsed))
+        drafts = {}
+        for position, draft in parsed.items():
+            index = indices[position]
+            tone, length = variants[index]
+            fields = dict(key_points=key_points, recipient=recipient, sender=sender, purpose=purpose, tone=tone, length=length)
+            request_key = self._email_request_key(use_cache, **fields)
+            self._store(request_key, draft, started)
+            drafts[index] = self._remember(request_key, fields, draft)
+        if len(drafts) < len(subset):
+            logging.warning(f"Parsed {len(drafts)} of {len(subset)} variants; generating the rest separately.")
+        return drafts
+
+    def request_suggestions(self, email_text, use_cache=True, priority=PRIORITY_INTERACTIVE):
+        """Fetch improvement suggestions from Groq, raising on failure."""
+        request_key = None
+        if use_cache:
+            request_key = make_cache_key("improve", self.model_name, IMPROVE_MAX_TOKENS, email_text=email_text)
+            cached = self._cached(request_key)
+            if cached is not None:
+                logging.info("Suggestions served from cache.")
+                return cached
+            return self._flights.do(
+                (request_key, priority), lambda: self._complete_suggestions(email_text, request_key, priority)
+            )
+        return self._complete_suggestions(email_text, None, priority)
+
+    def _complete_suggestions(self, email_text, request_key, priority=PRIORITY_INTERACTIVE):
+        logging.info("Improving email with Groq...")
+        started = time.perf_counter()
+        chat_completion = self._routed_completion(
+            ("improve_email", None), self.prompts.improve_messages(email_text)[0], IMPROVE_MAX_TOKENS, "improve_email",
+            priority,
+        )
+        suggestions = chat_completion.choices[0].message.content
+        self._store(request_key, suggestions, started)
+        return suggestions
+
+    def needs_llm_review(self, email_text, deep=False):
+        """True when improve_email would ask Groq: deep suggestions were requested or the local score is low."""
+        return deep or analyze_email(email_text)["score"] < self.analysis_threshold
+
+    def improve_email(self, email_text, use_cache=True, deep=False, priority=PRIORITY_INTERACTIVE, prefetched=None):
+        """Suggest improvements for an email.
+
+        Local checks answer instantly; Groq is only asked for stylistic suggestions when
+        deep=True or the draft scores below analysis_threshold. `prefetched` is a
+        request_suggestions result fetched earlier (see ImprovementPrefetcher) to use instead.
+        """
+        report = analyze_email(email_text)
+        quick = format_findings(report)
+        if not deep and report["score"] >= self.analysis_threshold:
+            logging.info(f"Suggestions served by local checks (score {report['score']}).")
+            return quick
+        try:
+            suggestions = prefetched or self.request_suggestions(email_text, use_cache=use_cache, priority=priority)
         except Exception as e:
             logging.error(f"Error during email improvement: {e}")
-            return f"Failed to get suggestions. Error: {e}"
+            suggestions = f"Failed to get suggestions. Error: {e}"
+        return f"{quick}\n\n{suggestions}" if report["findings"] else suggestions
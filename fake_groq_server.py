@@ -0,0 +1,274 @@
+"""Local stand-in for the Groq chat-completions API, for benchmarks and offline testing.
+
+Usage:
+    python fake_groq_server.py --port 8765 --latency 0.05 --tokens-per-second 1500
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=test streamlit run app.py
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PREFIX = "/openai/v1"
+_VARIANT_HEADER = re.compile(r"^=== VARIANT .* ===$", re.MULTILINE)
+FILLER_WORDS = (
+    "thank you for your time and consideration regarding the points below we would appreciate "
+    "a reply at your earliest convenience please let me know if anything is unclear"
+).split()
+
+
+class FakeGroqConfig:
+    """Behaviour knobs for the fake server; can be changed while it is running."""
+
+    def __init__(self, latency=0.05, tokens_per_second=1500.0, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=0.05, output_tokens=None, models=("llama-3.1-8b-instant",)):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.output_tokens = output_tokens
+        self.models = list(models)
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+
+def _fake_email(token_count):
+    words = ["Subject:", "Follow-up", "\n\nDear", "colleague,\n\n"]
+    while len(words) < max(token_count - 3, 4):
+        words.append(random.choice(FILLER_WORDS))
+    words.extend(["\n\nBest", "regards"])
+    return " ".join(words)
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Small SSE writes otherwise stall on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+    config = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _rate_limit_headers(self):
+        return {
+            "x-ratelimit-limit-tokens": "1000000",
+            "x-ratelimit-remaining-tokens": "999000",
+            "x-ratelimit-remaining-requests": "100000",
+        }
+
+    def do_GET(self):
+        config = self.config
+        if self.path == "/stats":
+            self._send_json(200, {"requests": config.requests})
+        elif self.path == f"{API_PREFIX}/models":
+            data = [{"id": name, "object": "model", "created": 0, "owned_by": "fake", "active": True,
+                     "context_window": 8192} for name in config.models]
+            self._send_json(200, {"object": "list", "data": data})
+        elif self.path.startswith(f"{API_PREFIX}/models/"):
+            name = self.path.rsplit("/", 1)[-1]
+            if name in config.models:
+                self._send_json(200, {"id": name, "object": "model", "created": 0, "owned_by": "fake"})
+            else:
+                self._send_json(404, {"error": {"message": f"model {name} not found"}})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        config = self.config
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != f"{API_PREFIX}/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        with config.lock:
+            config.requests += 1
+
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            headers = dict(self._rate_limit_headers(), **{"retry-after": str(config.retry_after)})
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "tokens"}}, headers)
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._send_json(500, {"error": {"message": "Injected server error"}})
+            return
+
+        max_tokens = request.get("max_tokens") or 300
+        completion_tokens = min(max_tokens, config.output_tokens or int(max_tokens * 0.8))
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        finish_reason = "length" if completion_tokens >= max_tokens else "stop"
+        prompt = str(request.get("messages", [{}])[-1].get("content", ""))
+        headers = _VARIANT_HEADER.findall(prompt)
+        if headers:
+            # Multi-variant prompts get one delimited fake email per requested variant
+            share = max(completion_tokens // len(headers) - 8, 4)
+            text = "\n".join(f"{header}\n{_fake_email(share)}\n" for header in headers)
+        else:
+            text = _fake_email(completion_tokens)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        model = request.get("model", config.models[0])
+
+        time.sleep(config.latency)
+        if request.get("stream"):
+            self._stream(text, model, usage, finish_reason)
+            return
+        time.sleep(completion_tokens / config.tokens_per_second)
+        self._send_json(200, {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": finish_reason}],
+            "usage": usage,
+        }, self._rate_limit_headers())
+
+    def _stream(self, text, model, usage, finish_reason):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in self._rate_limit_headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def emit(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        words = text.split(" ")
+        started = time.perf_counter()
+        for i, word in enumerate(words):
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                     "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}]}
+            emit(json.dumps(chunk))
+            # Pace against a schedule rather than sleeping per token, so overhead does not accumulate
+            ahead = started + (i + 1) / self.config.tokens_per_second - time.perf_counter()
+            if ahead > 0:
+                time.sleep(ahead)
+        final = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": model,
+                 "choices": [{"index": 0, "delta": {}, "finish_reason": finish_reason}],
+                 "x_groq": {"id": "fake", "usage": usage}}
+        emit(json.dumps(final))
+        emit("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+class _FakeGroqHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under benchmark concurrency
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clients closing a stream early (or timing out) are expected; only report real errors
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+class FakeGroqServer:
+    """Runs the fake API on a background thread; use as a context manager."""
+
+    def __init__(self, host="127.0.0.1", port=0, config=None):
+        self.config = config or FakeGroqConfig()
+        handler = type("ConfiguredFakeGroqHandler", (FakeGroqHandler,), {"config": self.config})
+        self.httpd = _FakeGroqHTTPServer((host, port), handler)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _serve_in_child(config, connection):
+    server = FakeGroqServer(config=config)
+    connection.send(server.base_url)
+    server.httpd.serve_forever()
+
+
+class FakeGroqProcess:
+    """Runs the fake API in a child process so it does not share the client's GIL."""
+
+    def __init__(self, config=None):
+        self.config = config or FakeGroqConfig()
+        self.base_url = None
+        self._process = None
+
+    def start(self):
+        parent, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve_in_child, args=(self.config, child), daemon=True)
+        self._process.start()
+        self.base_url = parent.recv()
+        return self
+
+    def stop(self):
+        self._process.terminate()
+        self._process.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Groq chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=1500.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    config = FakeGroqConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                            error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate)
+    server = FakeGroqServer(args.host, args.port, config)
+    print(f"Fake Groq API listening on {server.base_url} (set GROQ_BASE_URL to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import time
+import logging
+import threading
+
+HEALTH_TTL_SECONDS = 300
+HEALTH_FAILURE_TTL_SECONDS = 15
+
+STATUS_PENDING = "pending"
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+
+
+class HealthProbe:
+    """Process-wide, TTL-cached Groq health check.
+
+    Probes with a model lookup (GET /models/{id}) instead of a chat completion, so it
+    costs no tokens. Callers read the last known result without blocking; a stale
+    result triggers a single background refresh (stale-while-revalidate).
+    """
+
+    def __init__(self, client, model_name, ttl=HEALTH_TTL_SECONDS, failure_ttl=HEALTH_FAILURE_TTL_SECONDS):
+        self.client = client
+        self.model_name = model_name
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.state = STATUS_PENDING
+        self.message = "Checking Groq API connection..."
+        self.checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._refreshing = None
+
+    def _probe(self):
+        """Runs one health probe and stores the result."""
+        try:
+            self.client.models.retrieve(self.model_name)
+            state, message = STATUS_OK, f"Connected successfully to Groq ({self.model_name})"
+            logging.info("✅ Groq connection successful!")
+        except Exception as e:
+            logging.error(f"Groq connection error: {e}")
+            state = STATUS_ERROR
+            message = f"Failed to connect to Groq. Please check your API key and internet connection. Error: {e}"
+        with self._lock:
+            self.state, self.message, self.checked_at = state, message, time.monotonic()
+            self._refreshing = None
+
+    def _is_stale(self):
+        ttl = self.ttl if self.state == STATUS_OK else self.failure_ttl
+        return self.state == STATUS_PENDING or time.monotonic() - self.checked_at > ttl
+
+    def refresh(self):
+        """Starts a background probe unless one is already running; returns its thread."""
+        with self._lock:
+            if self._refreshing is None:
+                self._refreshing = threading.Thread(target=self._probe, name="groq-health-probe", daemon=True)
+                self._refreshing.start()
+            return self._refreshing
+
+    def status(self, wait=0.0):
+        """Returns (state, message) without blocking for longer than `wait` seconds.
+
+        A stale or missing result schedules a background refresh; the previous result
+        is returned meanwhile, so callers can proceed optimistically.
+        """
+        with self._lock:
+            stale = self._is_stale()
+        if stale:
+            thread = self.refresh()
+            if wait:
+                thread.join(timeout=wait)
+        with self._lock:
+            return self.state, self.message
+
+    def check(self, timeout=10.0):
+        """Forces a fresh probe and waits for it; returns (ok, message)."""
+        with self._lock:
+            self.checked_at = float("-inf")
+        self.refresh().join(timeout=timeout)
+        state, message = self.status()
+        return state == STATUS_OK, message
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+from request_scheduler import PRIORITY_BULK
+
+DEFAULT_PREFETCH_WORKERS = 2
+DEFAULT_MAX_PREFETCHED = 256
+# How long "Improve This Email" waits on an in-flight prefetch before asking Groq itself.
+# Kept short: the prefetch runs at bulk priority and may still be queued behind other bulk work
+DEFAULT_PREFETCH_WAIT_SECONDS = 2
+
+
+def draft_hash(email_text):
+    """Stable identifier for a draft's exact text."""
+    return hashlib.sha256(email_text.encode("utf-8")).hexdigest()
+
+
+class ImprovementPrefetcher:
+    """Fetches improve_email suggestions in the background as soon as a draft exists.
+
+    Results are keyed by the draft's hash so "Improve This Email" can usually answer
+    instantly. Prefetching is skipped whenever the scheduler reports rate-limit
+    pressure, so it never competes with interactive generations for quota, and for
+    drafts the local checks already pass, since those are answered without Groq.
+    """
+
+    def __init__(self, generator, max_workers=DEFAULT_PREFETCH_WORKERS, max_entries=DEFAULT_MAX_PREFETCHED):
+        self.generator = generator
+        self.max_entries = max_entries
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="improve-prefetch")
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.local_only = 0
+
+    def _pressured(self):
+        scheduler = getattr(self.generator, "scheduler", None)
+        return scheduler is not None and scheduler.under_pressure()
+
+    def _fetch(self, email_text):
+        # Re-check at start time: pressure may have built up while this job was queued
+        if self._pressured():
+            self.skipped += 1
+            logging.info("Skipping improvement prefetch: rate limiter under pressure.")
+            return None
+        # Speculative work: bulk priority so it never delays a user's own request
+        return self.generator.request_suggestions(email_text, priority=PRIORITY_BULK)
+
+    def prefetch(self, email_text):
+        """Starts fetching suggestions for email_text unless already known or throttled; returns the key."""
+        key = draft_hash(email_text)
+        needs_llm_review = getattr(self.generator, "needs_llm_review", None)
+        if needs_llm_review is not None and not needs_llm_review(email_text):
+            self.local_only += 1
+            return key
+        if self._pressured():
+            self.skipped += 1
+            return key
+        with self._lock:
+            if key in self._futures:
+                self._futures.move_to_end(key)
+                return key
+            self._futures[key] = self._executor.submit(self._fetch, email_text)
+            while len(self._futures) > self.max_entries:
+                _, oldest = self._futures.popitem(last=False)
+                oldest.cancel()
+        return key
+
+    def get(self, email_text, timeout=None):
+        """Returns prefetched suggestions, waiting up to `timeout` for an in-flight fetch.
+
+        Returns None when nothing usable was prefetched; callers then fall back to improve_email.
+        """
+        key = draft_hash(email_text)
+        with self._lock:
+            future = self._futures.get(key)
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=timeout)
+        except (CancelledError, TimeoutError):
+            return None
+        except Exception as e:
+            logging.warning(f"Prefetched suggestions failed: {e}")
+            with self._lock:
+                self._futures.pop(key, None)
+            return None
+        if result is None:
+            with self._lock:
+                self._futures.pop(key, None)
+        return result
+
+    def cancel(self, email_text):
+        """Cancels the prefetch for a draft; a fetch already in flight finishes but is discarded."""
+        with self._lock:
+            future = self._futures.pop(draft_hash(email_text), None)
+        if future is not None:
+            future.cancel()
+
+    def cancel_all(self):
+        """Cancels every pending prefetch."""
+        with self._lock:
+            futures = list(self._futures.values())
+            self._futures.clear()
+        for future in futures:
+            future.cancel()
+
+    def shutdown(self):
+        """Cancels pending work and stops the worker threads."""
+        self.cancel_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
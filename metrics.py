@@ -0,0 +1,195 @@
+import math
+import threading
+from collections import defaultdict
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.0, 60.0)
+THROUGHPUT_BUCKETS = (10, 25, 50, 100, 200, 300, 500, 750, 1000, 1500, 2000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+# name -> (help text, bucket bounds)
+HISTOGRAMS = {
+    "llm_queue_wait_seconds": ("Time spent waiting for the rate limiter before sending.", LATENCY_BUCKETS),
+    "llm_time_to_first_token_seconds": ("Time from send until the first output token.", LATENCY_BUCKETS),
+    "llm_request_latency_seconds": ("Total time from send until the completion finished, including retries.", LATENCY_BUCKETS),
+    "llm_output_tokens_per_second": ("Completion tokens per second of generation time.", THROUGHPUT_BUCKETS),
+    "llm_prompt_tokens": ("Prompt tokens per request.", TOKEN_BUCKETS),
+    "llm_completion_tokens": ("Completion tokens per request.", TOKEN_BUCKETS),
+}
+
+
+def percentile(values, q):
+    """Returns the q-th percentile (0-100) of raw samples using nearest-rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class Histogram:
+    """Fixed-bucket histogram compatible with the Prometheus exposition format."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Estimates the q-quantile (0-1) by interpolating inside the matching bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= target and bucket_count:
+                # Clamp bucket edges to the observed range so sparse data is not smeared
+                lower = max(self.bounds[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(self.bounds[i] if i < len(self.bounds) else self.max, self.max)
+                return lower + (upper - lower) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{str(value).replace(chr(34), chr(39))}"' for name, value in labels.items())
+
+
+class LLMMetrics:
+    """Per-method and per-model latency, throughput and token usage for every Groq call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._requests = defaultdict(int)
+            self._tokens = defaultdict(int)
+            self._finish_reasons = defaultdict(int)
+            self._errors = defaultdict(int)
+
+    def _observe(self, name, method, model, value):
+        key = (name, method, model)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram(HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+    def record_call(self, method, model, queue_wait=0.0, ttft=None, latency=None,
+                    prompt_tokens=None, completion_tokens=None, finish_reason=None, error=None):
+        """Records one finished (or failed) LLM call."""
+        model = model or "unknown"
+        with self._lock:
+            self._requests[(method, model)] += 1
+            self._observe("llm_queue_wait_seconds", method, model, queue_wait)
+            if error is not None:
+                self._errors[(method, model, error.__class__.__name__)] += 1
+                return
+            if latency is not None:
+                self._observe("llm_request_latency_seconds", method, model, latency)
+            if ttft is not None:
+                self._observe("llm_time_to_first_token_seconds", method, model, ttft)
+            if prompt_tokens is not None:
+                self._tokens[(method, model, "prompt")] += prompt_tokens
+                self._observe("llm_prompt_tokens", method, model, prompt_tokens)
+            if completion_tokens is not None:
+                self._tokens[(method, model, "completion")] += completion_tokens
+                self._observe("llm_completion_tokens", method, model, completion_tokens)
+                # Generation time excludes the wait for the first token when streaming
+                generation_time = latency
+                if ttft is not None and latency and latency > ttft:
+                    generation_time = latency - ttft
+                if generation_time:
+                    self._observe("llm_output_tokens_per_second", method, model, completion_tokens / generation_time)
+            if finish_reason:
+                self._finish_reasons[(method, model, finish_reason)] += 1
+
+    def snapshot(self):
+        """Returns a dict of per-(method, model) summaries for the Python API and the stats panel."""
+        with self._lock:
+            summary = {}
+            for (method, model), count in self._requests.items():
+                entry = summary.setdefault(f"{method} [{model}]", {"method": method, "model": model})
+                entry["requests"] = count
+                entry["errors"] = {
+                    error: n for (m, mod, error), n in self._errors.items() if (m, mod) == (method, model)
+                }
+                entry["finish_reasons"] = {
+                    reason: n for (m, mod, reason), n in self._finish_reasons.items() if (m, mod) == (method, model)
+                }
+                entry["prompt_tokens_total"] = self._tokens.get((method, model, "prompt"), 0)
+                entry["completion_tokens_total"] = self._tokens.get((method, model, "completion"), 0)
+                for name in HISTOGRAMS:
+                    histogram = self._histograms.get((name, method, model))
+                    if histogram is None:
+                        continue
+                    short = name.replace("llm_", "").replace("_seconds", "")
+                    entry[short] = {
+                        "mean": round(histogram.mean(), 3),
+                        "p50": round(histogram.quantile(0.5), 3),
+                        "p95": round(histogram.quantile(0.95), 3),
+                        "p99": round(histogram.quantile(0.99), 3),
+                    }
+            return summary
+
+    def render_prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            lines.append("# HELP llm_requests_total LLM calls by method and model.")
+            lines.append("# TYPE llm_requests_total counter")
+            for (method, model), count in sorted(self._requests.items()):
+                lines.append(f"llm_requests_total{{{_labels(method=method, model=model)}}} {count}")
+            lines.append("# HELP llm_errors_total Failed LLM calls by error class.")
+            lines.append("# TYPE llm_errors_total counter")
+            for (method, model, error), count in sorted(self._errors.items()):
+                lines.append(f"llm_errors_total{{{_labels(method=method, model=model, error=error)}}} {count}")
+            lines.append("# HELP llm_finish_reason_total Completions by finish_reason.")
+            lines.append("# TYPE llm_finish_reason_total counter")
+            for (method, model, reason), count in sorted(self._finish_reasons.items()):
+                lines.append(f"llm_finish_reason_total{{{_labels(method=method, model=model, reason=reason)}}} {count}")
+            lines.append("# HELP llm_tokens_total Prompt and completion tokens used.")
+            lines.append("# TYPE llm_tokens_total counter")
+            for (method, model, kind), count in sorted(self._tokens.items()):
+                lines.append(f"llm_tokens_total{{{_labels(method=method, model=model, type=kind)}}} {count}")
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, method, model), histogram in sorted(self._histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{{{_labels(method=method, model=model, le=bound)}}} {cumulative}")
+                    lines.append(f"{name}_bucket{{{_labels(method=method, model=model, le='+Inf')}}} {histogram.count}")
+                    lines.append(f"{name}_sum{{{_labels(method=method, model=model)}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{_labels(method=method, model=model)}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = LLMMetrics()
+
+
+def get_metrics():
+    """Returns the process-wide metrics registry."""
+    return _metrics
@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import logging
+import threading
+from request_scheduler import PRIORITY_BULK
+
+DEFAULT_REGISTRY_PATH = os.getenv("GROQ_MODEL_REGISTRY_PATH", ".groq_models.json")
+DEFAULT_TTL_SECONDS = 24 * 3600
+# Model families that are not general chat models
+NON_CHAT_MARKERS = ("whisper", "tts", "guard", "playai", "embed", "distil", "orpheus", "compound")
+# Reasoning models spend the completion budget on hidden reasoning before the email text
+REASONING_MARKERS = ("qwen3", "qwq", "gpt-oss", "deepseek-r1", "magistral", "reasoning")
+PROBE_PROMPT = "Reply with one short sentence confirming you are available."
+PROBE_MAX_TOKENS = 32
+# Completion size used to compare models: roughly a Medium email
+TYPICAL_COMPLETION_TOKENS = 300
+MAX_CANDIDATES = 3
+
+
+def is_chat_model(model_id):
+    model_id = model_id.lower()
+    return not any(marker in model_id for marker in NON_CHAT_MARKERS + REASONING_MARKERS)
+
+
+class ModelRegistry:
+    """Discovers the chat models the API key can use, probes their speed, and caches the results.
+
+    The results are kept in a small JSON file so startup can pick the fastest model without
+    a network round trip; refresh() re-discovers and re-probes once the file is older than
+    the TTL or was recorded against a different API base URL.
+    """
+
+    def __init__(self, client, scheduler=None, path=DEFAULT_REGISTRY_PATH, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.client = client
+        self.scheduler = scheduler
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.base_url = str(client.base_url)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {"updated_at": 0, "base_url": self.base_url, "models": {}}
+        if data.get("base_url") != self.base_url:
+            # Results from another endpoint (e.g. the fake benchmark server) do not apply here
+            return {"updated_at": 0, "base_url": self.base_url, "models": {}}
+        return data
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def is_stale(self):
+        return time.time() - self._data.get("updated_at", 0) > self.ttl_seconds
+
+    def discover(self):
+        """Returns the ids of the active chat models the API key can use."""
+        return sorted(
+            model.id for model in self.client.models.list().data
+            if is_chat_model(model.id) and getattr(model, "active", True) is not False
+        )
+
+    def _send_probe(self, model):
+        return self.client.chat.completions.with_raw_response.create(
+            messages=[{"role": "user", "content": PROBE_PROMPT}],
+            model=model, max_tokens=PROBE_MAX_TOKENS, stream=True,
+        )
+
+    def probe(self, model):
+        """Measures time to first token and output tokens per second with one short streamed call."""
+        started = time.perf_counter()
+        if self.scheduler is not None:
+            stream, done = self.scheduler.open_stream(
+                lambda: self._send_probe(model), estimated_tokens=PROBE_MAX_TOKENS * 2,
+                method="probe_model", model=model,
+                # Background discovery: never delay a user's request
+                priority=PRIORITY_BULK,
+            )
+        else:
+            stream, done = self._send_probe(model).parse(), None
+        first_token_at = None
+        usage = None
+        error = None
+        try:
+            for chunk in stream:
+                x_groq = getattr(chunk, "x_groq", None)
+                if x_groq is not None and getattr(x_groq, "usage", None):
+                    usage = x_groq.usage
+                if chunk.choices and chunk.choices[0].delta.content and first_token_at is None:
+                    first_token_at = time.perf_counter()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            stream.close()
+            if done is not None:
+                done(usage, None, first_token_at, error)
+        finished = time.perf_counter()
+        first_token_at = first_token_at or finished
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        generation_time = finished - first_token_at
+        return {
+            "ttft": round(first_token_at - started, 4),
+            "tokens_per_second": round(completion_tokens / generation_time, 1) if generation_time > 0 and completion_tokens else None,
+        }
+
+    def refresh(self):
+        """Re-discovers and re-probes every chat model, then persists the results."""
+        models = {}
+        for model in self.discover():
+            try:
+                models[model] = dict(self.probe(model), ok=True)
+            except Exception as e:
+                logging.warning(f"Probe of {model} failed: {e}")
+                models[model] = {"ok": False, "error": str(e)}
+        with self._lock:
+            self._data = {"updated_at": time.time(), "base_url": self.base_url, "models": models}
+            self._save()
+        logging.info(f"Model registry refreshed: {self.ranked()}")
+        return models
+
+    def refresh_in_background(self, on_refresh=None):
+        """Refreshes on a daemon thread if the cached results are stale; on_refresh(ranked) runs afterwards."""
+        with self._lock:
+            if self._refreshing or not self.is_stale():
+                return False
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh()
+                if on_refresh is not None:
+                    on_refresh(self.ranked())
+            except Exception as e:
+                logging.warning(f"Model registry refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=run, name="model-registry-refresh", daemon=True).start()
+        return True
+
+    @staticmethod
+    def expected_seconds(result, completion_tokens=TYPICAL_COMPLETION_TOKENS):
+        """Estimated time to produce a typical email with this model."""
+        tokens_per_second = result.get("tokens_per_second")
+        generation = completion_tokens / tokens_per_second if tokens_per_second else 0.0
+        return result["ttft"] + generation
+
+    def ranked(self, limit=MAX_CANDIDATES):
+        """Returns the working models from the cached results, fastest first; no network access."""
+        with self._lock:
+            results = self._data.get("models", {})
+            # is_chat_model again: files written before a family was excluded may still list it
+            working = [
+                (self.expected_seconds(r), model) for model, r in results.items()
+                if r.get("ok") and is_chat_model(model)
+            ]
+        return [model for _, model in sorted(working)][:limit]
+
+    def results(self):
+        with self._lock:
+            return dict(self._data.get("models", {}))
@@ -0,0 +1,196 @@
+import os
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+from metrics import percentile
+
+DEFAULT_MODELS = ("llama-3.1-8b-instant",)
+# Deadline before a hedge is sent while a route has too few samples for a p95
+DEFAULT_HEDGE_AFTER = float(os.getenv("GROQ_HEDGE_AFTER", "2.0"))
+MIN_HEDGE_DELAY = 0.1
+# With a tight latency distribution p95 sits just above the median, where a hedge cannot win
+HEDGE_MEDIAN_MULTIPLIER = 1.5
+MIN_SAMPLES = 5
+PROFILE_WINDOW = 200
+ERROR_COOLDOWN_SECONDS = 30.0
+
+
+def configured_models():
+    """Returns the models pinned in GROQ_MODELS (comma-separated), in order of preference, or []."""
+    return [name.strip() for name in os.getenv("GROQ_MODELS", "").split(",") if name.strip()]
+
+
+class LatencyProfile:
+    """Recent latencies of one model on one route."""
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.consecutive_errors = 0
+        self.last_error_at = float("-inf")
+
+    def observe(self, latency):
+        self.samples.append(latency)
+        self.consecutive_errors = 0
+
+    def observe_error(self):
+        self.consecutive_errors += 1
+        self.last_error_at = time.monotonic()
+
+    def p95(self):
+        """Returns the p95 latency, or None until there are MIN_SAMPLES samples."""
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        return percentile(self.samples, 95)
+
+    def hedge_delay(self):
+        """Returns the hedge deadline: the p95, but never less than HEDGE_MEDIAN_MULTIPLIER x p50."""
+        if len(self.samples) < MIN_SAMPLES:
+            return None
+        return max(percentile(self.samples, 95), HEDGE_MEDIAN_MULTIPLIER * percentile(self.samples, 50))
+
+    def failing(self):
+        return self.consecutive_errors > 0 and time.monotonic() - self.last_error_at < ERROR_COOLDOWN_SECONDS
+
+
+class ModelRouter:
+    """Routes each call to the candidate model with the best measured p95 and hedges slow calls.
+
+    Routes are arbitrary keys such as ("generate_email", "Long"), so each length class gets
+    its own latency profile per model. Models without enough samples are tried first so every
+    candidate gets measured; models that just failed are tried last.
+
+    When the first attempt has not finished by its p95 (at least 1.5x its median), a duplicate is sent to the
+    next-ranked model (or the same model when only one is configured) and the first successful
+    answer wins. Failed attempts fail over to the next model immediately.
+    """
+
+    def __init__(self, models=None, hedge_after=DEFAULT_HEDGE_AFTER, should_hedge=None):
+        self.models = list(models or configured_models() or DEFAULT_MODELS)
+        self.hedge_after = hedge_after
+        # Lets the caller suppress hedges, e.g. while the rate limiter is under pressure
+        self.should_hedge = should_hedge or (lambda: True)
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _profile(self, route, model):
+        profile = self._profiles.get((route, model))
+        if profile is None:
+            profile = self._profiles[(route, model)] = LatencyProfile()
+        return profile
+
+    def rank(self, route):
+        """Returns the candidate models for route, best first."""
+        with self._lock:
+            def key(item):
+                index, model = item
+                profile = self._profile(route, model)
+                p95 = profile.p95()
+                return (profile.failing(), p95 is not None, p95 or 0.0, index)
+            return [model for _, model in sorted(enumerate(self.models), key=key)]
+
+    def set_models(self, models):
+        """Replaces the candidate list; learned profiles are kept for models that remain."""
+        if models:
+            self.models = list(models)
+
+    def hedge_delay(self, route, model):
+        """Seconds to wait on model before sending a hedge."""
+        with self._lock:
+            delay = self._profile(route, model).hedge_delay()
+        return self.hedge_after if delay is None else max(MIN_HEDGE_DELAY, delay)
+
+    def _timed(self, route, model, fn):
+        started = time.perf_counter()
+        try:
+            result = fn(model)
+        except Exception:
+            with self._lock:
+                self._profile(route, model).observe_error()
+            raise
+        with self._lock:
+            self._profile(route, model).observe(time.perf_counter() - started)
+        return result
+
+    def _start(self, route, model, fn):
+        """Runs one attempt on its own thread so a hedge never queues behind other work."""
+        future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(self._timed(route, model, fn))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"route-{model}", daemon=True).start()
+        return future
+
+    @staticmethod
+    def _abandon(future, discard):
+        """Cancels a losing attempt; one already on the wire has its result discarded when it lands."""
+        if future.cancel() or discard is None:
+            return
+
+        def on_done(f):
+            if not f.cancelled() and f.exception() is None:
+                discard(f.result())
+
+        future.add_done_callback(on_done)
+
+    def call(self, route, fn, discard=None):
+        """Returns fn(model) from the first successful attempt.
+
+        discard(result) is called for the result of an attempt that lost the race, e.g. to
+        close a stream; attempts that fail are simply dropped.
+        """
+        ranked = self.rank(route)
+        primary, alternates = ranked[0], ranked[1:]
+        first = self._start(route, primary, fn)
+        pending = {first}
+        deadline = time.perf_counter() + self.hedge_delay(route, primary)
+        may_hedge = True
+        last_error = None
+        while pending:
+            timeout = max(0.0, deadline - time.perf_counter()) if may_hedge else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # At most one hedge per call, and none while the caller says capacity is tight
+                may_hedge = False
+                if self.should_hedge():
+                    model = alternates.pop(0) if alternates else primary
+                    with self._lock:
+                        self.hedged += 1
+                    logging.info(f"{primary} passed its {route} deadline; hedging to {model}.")
+                    pending.add(self._start(route, model, fn))
+                continue
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        self._abandon(other, discard)
+                    if future is not first:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                last_error = future.exception()
+            if not pending and alternates:
+                model = alternates.pop(0)
+                logging.warning(f"{route} failed on {primary}; failing over to {model}.")
+                may_hedge = False
+                pending.add(self._start(route, model, fn))
+        raise last_error
+
+    def stats(self):
+        """Returns per-route, per-model sample counts and p95s plus hedge counters."""
+        with self._lock:
+            profiles = {
+                f"{route} [{model}]": {"samples": len(profile.samples), "p95": profile.p95(),
+                                       "consecutive_errors": profile.consecutive_errors}
+                for (route, model), profile in self._profiles.items()
+            }
+            return {"models": list(self.models), "hedged": self.hedged, "hedge_wins": self.hedge_wins,
+                    "profiles": profiles}
@@ -0,0 +1,175 @@
+import re
+import logging
+
+# Static prefix shared by every email request; kept byte-identical so it is only built once
+EMAIL_SYSTEM_PROMPT = (
+    "You are a professional AI assistant that drafts clear, well-structured, and courteous emails. "
+    "Always begin with a concise and relevant subject line (\"Subject: ...\"). "
+    "Ensure the body of the email is complete, polite, well-organized, and covers every key point provided. "
+    "Conclude every email with an appropriate closing and sign-off. "
+    "Do not provide explanations, commentary, or incomplete messages—only the final email content."
+)
+
+IMPROVE_INSTRUCTIONS = (
+    "Analyze the following email and provide 3-4 specific, actionable suggestions for how to improve it. "
+    "Focus on clarity, tone, and professionalism. Format your suggestions as a bulleted list."
+)
+
+DEFAULT_INPUT_TOKEN_BUDGET = 1200
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = " [...]"
+
+# Delimiter line before each draft in a multi-variant completion
+VARIANT_HEADER = "=== VARIANT {index}: {tone}, {length} ==="
+_VARIANT_PATTERN = re.compile(r"^=+\s*VARIANT\s+(\d+)\b[^\n]*=*\s*$", re.MULTILINE)
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+# Sentence ends are [.!?] followed by whitespace, so "3.30 pm", "v2.0" and URLs stay whole
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    """Estimates the token count of text locally (words and punctuation, long words count extra)."""
+    return sum(1 + len(piece) // 8 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def estimate_message_tokens(messages, max_tokens=0):
+    """Estimates prompt tokens for chat messages plus the completion allowance."""
+    prompt_tokens = sum(estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+    return prompt_tokens + max_tokens
+
+
+def parse_variants(text, count):
+    """Splits a multi-variant completion into {index: draft}; missing or empty drafts are left out."""
+    matches = list(_VARIANT_PATTERN.finditer(text))
+    drafts = {}
+    for i, match in enumerate(matches):
+        index = int(match.group(1)) - 1
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        draft = text[match.end():end].strip()
+        if 0 <= index < count and draft and index not in drafts:
+            drafts[index] = draft
+    return drafts
+
+
+def _join_lines(lines):
+    return "\n".join(" ".join(sentences) for sentences in lines if sentences)
+
+
+def compress_text(text, budget):
+    """Fits text into `budget` tokens.
+
+    Whitespace is collapsed and, if the text fits, it is returned as is. Otherwise repeated
+    sentences are dropped first; if it is still too long, whole sentences are kept in order
+    until the budget is reached and a marker is appended. Line breaks are preserved.
+    Returns (text, was_truncated).
+    """
+    compact_lines = [" ".join(line.split()) for line in text.splitlines()]
+    compact = "\n".join(line for line in compact_lines if line)
+    if estimate_tokens(compact) <= budget:
+        return compact, False
+
+    lines = []
+    seen = set()
+    for line in compact_lines:
+        sentences = []
+        for sentence in _SENTENCE_BREAK.split(line):
+            key = sentence.lower()
+            if sentence and key not in seen:
+                seen.add(key)
+                sentences.append(sentence)
+        lines.append(sentences)
+    deduped = _join_lines(lines)
+    if estimate_tokens(deduped) <= budget:
+        return deduped, True
+
+    kept = []
+    used = estimate_tokens(TRUNCATION_MARKER)
+    for sentences in lines:
+        kept_line = []
+        kept.append(kept_line)
+        for sentence in sentences:
+            cost = estimate_tokens(sentence)
+            if used + cost > budget:
+                if not any(kept):
+                    # A single oversized sentence: keep as many words as fit
+                    for word in sentence.split():
+                        used += estimate_tokens(word)
+                        if used > budget:
+                            break
+                        kept_line.append(word)
+                return _join_lines(kept) + TRUNCATION_MARKER, True
+            kept_line.append(sentence)
+            used += cost
+    return _join_lines(kept) + TRUNCATION_MARKER, True
+
+
+class PromptBuilder:
+    """Builds compact chat prompts within an input token budget."""
+
+    def __init__(self, input_token_budget=DEFAULT_INPUT_TOKEN_BUDGET):
+        self.input_token_budget = input_token_budget
+        self._system_message = {"role": "system", "content": EMAIL_SYSTEM_PROMPT}
+        self._system_tokens = estimate_tokens(EMAIL_SYSTEM_PROMPT) + MESSAGE_OVERHEAD_TOKENS
+        self._improve_tokens = estimate_tokens(IMPROVE_INSTRUCTIONS) + MESSAGE_OVERHEAD_TOKENS
+
+    def email_messages(self, key_points, recipient, sender, purpose, tone, length):
+        """Returns (messages, input_tokens) for drafting an email."""
+        header = (
+            f"Write a {tone.lower()}, {length.lower()} email from {sender} to {recipient}.\n"
+            f"Purpose: {purpose}\n"
+            f"Key points:\n"
+        )
+        available = self.input_token_budget - self._system_tokens - estimate_tokens(header) - MESSAGE_OVERHEAD_TOKENS
+        key_points, truncated = compress_text(key_points, max(available, 0))
+        user_prompt = header + key_points
+        messages = [self._system_message, {"role": "user", "content": user_prompt}]
+        input_tokens = self._system_tokens + estimate_tokens(user_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self._log("email", input_tokens, truncated)
+        return messages, input_tokens
+
+    def variants_messages(self, key_points, recipient, sender, purpose, variants):
+        """Returns (messages, input_tokens) for drafting several (tone, length) variants in one completion.
+
+        The key points are sent once; each draft is preceded by a VARIANT_HEADER line so the
+        completion can be split with parse_variants.
+        """
+        headers = "\n".join(
+            VARIANT_HEADER.format(index=i + 1, tone=tone, length=length) for i, (tone, length) in enumerate(variants)
+        )
+        header = (
+            f"Write {len(variants)} versions of an email from {sender} to {recipient}, one for each line below, "
+            f"in this order. Start each version with its line exactly as written, followed by the complete email.\n"
+            f"{headers}\n"
+            f"Purpose: {purpose}\n"
+            f"Key points:\n"
+        )
+        available = self.input_token_budget - self._system_tokens - estimate_tokens(header) - MESSAGE_OVERHEAD_TOKENS
+        key_points, truncated = compress_text(key_points, max(available, 0))
+        user_prompt = header + key_points
+        messages = [self._system_message, {"role": "user", "content": user_prompt}]
+        input_tokens = self._system_tokens + estimate_tokens(user_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self._log("variants", input_tokens, truncated)
+        return messages, input_tokens
+
+    def improve_messages(self, email_text):
+        """Returns (messages, input_tokens) for requesting improvement suggestions."""
+        available = self.input_token_budget - self._improve_tokens - MESSAGE_OVERHEAD_TOKENS
+        truncated = False
+        if estimate_tokens(email_text) > available:
+            email_text, truncated = compress_text(email_text, max(available, 0))
+        prompt = f"{IMPROVE_INSTRUCTIONS}\n\nEmail to analyze:\n---\n{email_text}\n---\n\nSuggestions:"
+        input_tokens = estimate_tokens(prompt) + MESSAGE_OVERHEAD_TOKENS
+        self._log("improve", input_tokens, truncated)
+        return [{"role": "user", "content": prompt}], input_tokens
+
+    def continuation_messages(self, messages, partial_text):
+        """Returns messages that make the model continue a draft cut off at its token limit.
+
+        The partial draft is sent as a prefilled assistant turn, so the model picks up
+        mid-sentence and only the missing tail is generated and billed.
+        """
+        return list(messages) + [{"role": "assistant", "content": partial_text}]
+
+    def _log(self, kind, input_tokens, truncated):
+        note = " (truncated to fit the input budget)" if truncated else ""
+        logging.info(f"Prompt [{kind}] ~{input_tokens} input tokens{note}.")
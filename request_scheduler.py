@@ -0,0 +1,465 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+import groq
+from collections import deque
+from metrics import get_metrics, percentile
+
+# Groq free-tier limits for llama-3.1-8b-instant; override per deployment
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+
+# Priority classes, highest first. A class only gets a slot while no higher class is waiting.
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+# Per class: the fraction of the concurrency limit it may use, and the fraction of the
+# request/token buckets it must leave untouched, so an interactive call arriving during a
+# bulk burst still finds quota available
+DEFAULT_PRIORITY_LIMITS = {
+    PRIORITY_INTERACTIVE: {"concurrency": 1.0, "reserve": 0.0},
+    PRIORITY_BULK: {
+        "concurrency": float(os.getenv("GROQ_BULK_CONCURRENCY_SHARE", "1.0")),
+        "reserve": float(os.getenv("GROQ_BULK_QUOTA_RESERVE", "0.25")),
+    },
+}
+WAIT_SAMPLE_WINDOW = 500
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value):
+    """Parses rate-limit reset values such as "7.66s", "2m59.56s" or "120" into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    return sum(float(amount) * scale[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `capacity` per minute."""
+
+    def __init__(self, capacity):
+        self.capacity = float(capacity)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    @property
+    def refill_per_second(self):
+        return self.capacity / 60.0
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` is available (0 if it is available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second
+
+    def consume(self, amount):
+        self.level -= amount
+
+    def sync(self, remaining=None, limit=None):
+        """Aligns the bucket with the provider's view of the quota."""
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class RequestScheduler:
+    """Shared pacing, adaptive concurrency and retry policy for every Groq call.
+
+    Requests wait for both a requests-per-minute and a tokens-per-minute bucket.
+    Rate-limit response headers resync the buckets, a 429 halves the concurrency
+    limit and honours retry-after, and steady successes grow it back (AIMD).
+    Transient failures are retried with full-jitter exponential backoff.
+
+    Every call belongs to a priority class (interactive or bulk). Waiting interactive
+    calls are admitted before any bulk call, bulk calls are capped at their share of the
+    concurrency limit, and they wait rather than dip into the reserve kept in the request
+    and token buckets.
+    """
+
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, min_concurrency=1, max_retries=4,
+                 base_delay=0.5, max_delay=30.0, metrics=None, priority_limits=None):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency_limit = float(max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.in_flight = 0
+        self.waiting = 0
+        self.blocked_until = 0.0
+        self.retries = 0
+        self.throttled = 0
+        self.metrics = metrics or get_metrics()
+        self.priority_limits = priority_limits or DEFAULT_PRIORITY_LIMITS
+        self.waiting_by_priority = {priority: 0 for priority in PRIORITIES}
+        self.in_flight_by_priority = {priority: 0 for priority in PRIORITIES}
+        self._queue_waits = {priority: deque(maxlen=WAIT_SAMPLE_WINDOW) for priority in PRIORITIES}
+        self._cond = threading.Condition()
+
+    # --- admission ---
+
+    def _try_acquire(self, estimated_tokens, priority):
+        """Takes a slot if pacing allows; otherwise returns how long to wait. Caller holds the lock."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency_limit):
+            return 0.05
+        if any(self.waiting_by_priority[higher] for higher in PRIORITIES[:PRIORITIES.index(priority)]):
+            return 0.05
+        limits = self.priority_limits[priority]
+        if self.in_flight_by_priority[priority] >= max(1, int(self.concurrency_limit * limits["concurrency"])):
+            return 0.05
+        # The reserve is burst headroom, not a rate cap: bulk still gets the full refill rate
+        reserve = limits["reserve"]
+        wait = max(
+            self.request_bucket.wait_time(1 + reserve * self.request_bucket.capacity, now),
+            self.token_bucket.wait_time(estimated_tokens + reserve * self.token_bucket.capacity, now),
+        )
+        if wait > 0:
+            return wait
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(estimated_tokens)
+        self.in_flight += 1
+        self.in_flight_by_priority[priority] += 1
+        return 0.0
+
+    def _check_priority(self, priority):
+        if priority not in self.waiting_by_priority:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {', '.join(PRIORITIES)}.")
+
+    def acquire(self, estimated_tokens=0, priority=PRIORITY_INTERACTIVE):
+        """Blocks until a request of this priority may be sent; returns the time spent queued."""
+        self._check_priority(priority)
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            self.waiting_by_priority[priority] += 1
+            try:
+                while True:
+                    wait = self._try_acquire(estimated_tokens, priority)
+                    if wait == 0:
+                        break
+                    self._cond.wait(timeout=min(wait, 1.0))
+            finally:
+                self.waiting -= 1
+                self.waiting_by_priority[priority] -= 1
+            queue_wait = time.monotonic() - started
+            self._queue_waits[priority].append(queue_wait)
+        return queue_wait
+
+    async def acquire_async(self, estimated_tokens=0, priority=PRIORITY_INTERACTIVE):
+        """asyncio variant of acquire that never blocks the event loop."""
+        self._check_priority(priority)
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            self.waiting_by_priority[priority] += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(estimated_tokens, priority)
+                if wait == 0:
+                    break
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            with self._cond:
+                self.waiting -= 1
+                self.waiting_by_priority[priority] -= 1
+        queue_wait = time.monotonic() - started
+        with self._cond:
+            self._queue_waits[priority].append(queue_wait)
+        return queue_wait
+
+    def release(self, used_tokens=None, estimated_tokens=0, priority=PRIORITY_INTERACTIVE):
+        """Frees a slot and refunds or charges the difference between estimated and actual tokens."""
+        with self._cond:
+            self.in_flight -= 1
+            self.in_flight_by_priority[priority] -= 1
+            if used_tokens is not None:
+                self.token_bucket.consume(used_tokens - estimated_tokens)
+            self._cond.notify_all()
+
+    # --- feedback from responses ---
+
+    def observe_headers(self, headers):
+        """Resyncs the buckets and concurrency from x-ratelimit-* and retry-after headers."""
+        if not headers:
+            return
+        with self._cond:
+            remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+            limit_tokens = headers.get("x-ratelimit-limit-tokens")
+            if remaining_tokens is not None:
+                self.token_bucket.sync(remaining=float(remaining_tokens), limit=float(limit_tokens) if limit_tokens else None)
+                # Back off before the provider has to throttle us
+                if float(remaining_tokens) < 0.1 * self.token_bucket.capacity:
+                    self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * 0.75)
+            remaining_requests = headers.get("x-ratelimit-remaining-requests")
+            if remaining_requests is not None and float(remaining_requests) <= 0:
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                if reset:
+                    self.blocked_until = max(self.blocked_until, time.monotonic() + reset)
+            retry_after = parse_duration(headers.get("retry-after"))
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def _on_success(self):
+        with self._cond:
+            # Additive increase: roughly +1 slot per window of successful requests
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1.0 / max(1.0, self.concurrency_limit))
+
+    def _on_throttled(self):
+        with self._cond:
+            self.throttled += 1
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+
+    def _retry_delay(self, error, attempt):
+        """Returns the delay before retrying `error`, or None if it should not be retried."""
+        if attempt >= self.max_retries:
+            return None
+        if isinstance(error, groq.APIStatusError):
+            if error.status_code not in RETRYABLE_STATUS_CODES:
+                return None
+            self.observe_headers(error.response.headers)
+            if error.status_code == 429:
+                self._on_throttled()
+                retry_after = parse_duration(error.response.headers.get("retry-after"))
+                if retry_after:
+                    return retry_after + random.uniform(0, self.base_delay)
+        elif not isinstance(error, groq.APIConnectionError):
+            return None
+        # Full jitter keeps retries from many workers from synchronising
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _complete(self, raw_response, estimated_tokens, parsed, labels, queue_wait, started, priority):
+        self.observe_headers(raw_response.headers)
+        usage = getattr(parsed, "usage", None)
+        self.release(getattr(usage, "total_tokens", None), estimated_tokens, priority)
+        self._on_success()
+        latency = time.perf_counter() - started
+        choices = getattr(parsed, "choices", None)
+        self.metrics.record_call(
+            *labels, queue_wait=queue_wait, ttft=latency, latency=latency,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            finish_reason=choices[0].finish_reason if choices else None,
+        )
+
+    def _handle_failure(self, error, attempt, estimated_tokens, labels, queue_wait, started, priority):
+        """Releases the slot and returns the retry delay, recording the failure if it is final."""
+        self.release(0, estimated_tokens, priority)
+        delay = self._retry_delay(error, attempt)
+        if delay is None:
+            self.metrics.record_call(
+                *labels, queue_wait=queue_wait, latency=time.perf_counter() - started, error=error
+            )
+            return None
+        self.retries += 1
+        logging.warning(f"Transient Groq error ({error.__class__.__name__}); retry {attempt + 1} in {delay:.2f}s.")
+        return delay
+
+    def _stream_done(self, labels, estimated_tokens, queue_wait, started, priority):
+        """Builds the idempotent done() callback that releases a stream's slot and records it."""
+        released = []
+
+        def done(usage=None, finish_reason=None, first_token_at=None, error=None):
+            if released:
+                return
+            released.append(True)
+            self.release(getattr(usage, "total_tokens", None), estimated_tokens, priority)
+            if error is None:
+                self._on_success()
+            self.metrics.record_call(
+                *labels, queue_wait=queue_wait,
+                ttft=first_token_at - started if first_token_at else None,
+                latency=time.perf_counter() - started,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                finish_reason=finish_reason, error=error,
+            )
+
+        return done
+
+    # --- public entry points ---
+
+    def execute(self, send, estimated_tokens=0, method="chat", model=None, priority=PRIORITY_INTERACTIVE):
+        """Runs send() under pacing and retries, and returns the parsed response.
+
+        send must call a `with_raw_response` Groq method so headers can be inspected.
+        method and model label the call in the metrics registry; priority picks its class.
+        """
+        labels = (method, model)
+        attempt = 0
+        queue_wait = 0.0
+        started = None
+        while True:
+            queue_wait += self.acquire(estimated_tokens, priority)
+            started = started or time.perf_counter()
+            try:
+                raw_response = send()
+                parsed = raw_response.parse()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, estimated_tokens, labels, queue_wait, started, priority)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self._complete(raw_response, estimated_tokens, parsed, labels, queue_wait, started, priority)
+            return parsed
+
+    def open_stream(self, send, estimated_tokens=0, method="chat_stream", model=None, priority=PRIORITY_INTERACTIVE):
+        """Like execute, for streaming calls. Returns (stream, done); call done() once the stream is consumed.
+
+        Only opening the stream is retried; the slot stays held until done() is called.
+        done accepts the final usage, finish_reason, the perf_counter time of the first
+        token and, on failure, the error.
+        """
+        labels = (method, model)
+        attempt = 0
+        queue_wait = 0.0
+        started = None
+        while True:
+            queue_wait += self.acquire(estimated_tokens, priority)
+            started = started or time.perf_counter()
+            try:
+                raw_response = send()
+                stream = raw_response.parse()
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, estimated_tokens, labels, queue_wait, started, priority)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.observe_headers(raw_response.headers)
+            return stream, self._stream_done(labels, estimated_tokens, queue_wait, started, priority)
+
+    async def execute_async(self, send, estimated_tokens=0, method="chat", model=None, priority=PRIORITY_INTERACTIVE):
+        """asyncio variant of execute; send returns an awaitable raw response."""
+        labels = (method, model)
+        attempt = 0
+        queue_wait = 0.0
+        started = None
+        while True:
+            queue_wait += await self.acquire_async(estimated_tokens, priority)
+            started = started or time.perf_counter()
+            try:
+                raw_response = await send()
+                parsed = await raw_response.parse()
+            except asyncio.CancelledError as e:
+                self.release(0, estimated_tokens, priority)
+                self.metrics.record_call(*labels, queue_wait=queue_wait, latency=time.perf_counter() - started, error=e)
+                raise
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, estimated_tokens, labels, queue_wait, started, priority)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self._complete(raw_response, estimated_tokens, parsed, labels, queue_wait, started, priority)
+            return parsed
+
+    async def open_stream_async(self, send, estimated_tokens=0, method="chat_stream", model=None,
+                                priority=PRIORITY_INTERACTIVE):
+        """asyncio variant of open_stream; send returns an awaitable raw response."""
+        labels = (method, model)
+        attempt = 0
+        queue_wait = 0.0
+        started = None
+        while True:
+            queue_wait += await self.acquire_async(estimated_tokens, priority)
+            started = started or time.perf_counter()
+            try:
+                raw_response = await send()
+                stream = await raw_response.parse()
+            except asyncio.CancelledError as e:
+                self.release(0, estimated_tokens, priority)
+                self.metrics.record_call(*labels, queue_wait=queue_wait, latency=time.perf_counter() - started, error=e)
+                raise
+            except Exception as e:
+                delay = self._handle_failure(e, attempt, estimated_tokens, labels, queue_wait, started, priority)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.observe_headers(raw_response.headers)
+            return stream, self._stream_done(labels, estimated_tokens, queue_wait, started, priority)
+
+    def under_pressure(self):
+        """True when we are throttled, queueing, out of concurrency slots, or close to the quota ceiling."""
+        with self._cond:
+            now = time.monotonic()
+            self.token_bucket._refill(now)
+            self.request_bucket._refill(now)
+            return (
+                now < self.blocked_until
+                or self.waiting > 0
+                or self.in_flight >= self.concurrency_limit
+                or self.concurrency_limit < self.max_concurrency / 2
+                or self.token_bucket.level < 0.2 * self.token_bucket.capacity
+                or self.request_bucket.level < 0.2 * self.request_bucket.capacity
+            )
+
+    def stats(self):
+        """Returns a snapshot of pacing state for logging and dashboards."""
+        with self._cond:
+            return {
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "concurrency_limit": round(self.concurrency_limit, 2),
+                "tokens_available": round(self.token_bucket.level),
+                "requests_available": round(self.request_bucket.level, 1),
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "priorities": {
+                    priority: {
+                        "waiting": self.waiting_by_priority[priority],
+                        "in_flight": self.in_flight_by_priority[priority],
+                        "queue_wait_p50": round(percentile(self._queue_waits[priority], 50), 3),
+                        "queue_wait_p95": round(percentile(self._queue_waits[priority], 95), 3),
+                    }
+                    for priority in PRIORITIES
+                },
+            }
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_scheduler():
+    """Returns the process-wide scheduler so every generator draws on the same quota."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.getenv("EMAIL_CACHE_PATH", ".email_cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+def normalize_text(value):
+    """Collapses whitespace so cosmetic edits map to the same cache key."""
+    return " ".join(str(value).split())
+
+
+def make_cache_key(kind, model_name, max_tokens, **fields):
+    """Builds a stable key from the normalized request fields and model settings."""
+    payload = {name: normalize_text(value) for name, value in fields.items()}
+    payload["__kind"] = kind
+    payload["__model"] = model_name
+    payload["__max_tokens"] = max_tokens
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU with TTL, backed by SQLite so entries survive restarts and are shared by workers."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_memory_entries=512):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS responses ("
+                        "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                        "created_at REAL NOT NULL, latency REAL NOT NULL DEFAULT 0)"
+                    )
+            except sqlite3.Error as e:
+                logging.warning(f"Response cache disk store unavailable, using memory only: {e}")
+                self.path = None
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _remember(self, key, value, created_at, latency):
+        self._memory[key] = (value, created_at, latency)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _is_fresh(self, created_at):
+        return time.time() - created_at < self.ttl_seconds
+
+    def _load_from_disk(self, key):
+        if not self.path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at, latency FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache read failed: {e}")
+            return None
+        return row
+
+    def get(self, key):
+        """Returns the cached text for key, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and not self._is_fresh(entry[1]):
+                del self._memory[key]
+                entry = None
+            if entry:
+                self._memory.move_to_end(key)
+        if entry is None:
+            row = self._load_from_disk(key)
+            if row and self._is_fresh(row[1]):
+                entry = row
+                with self._lock:
+                    self._remember(key, *row)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry[2]
+        return entry[0]
+
+    def set(self, key, value, latency=0.0):
+        """Stores value under key in memory and on disk."""
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, value, created_at, latency)
+        if not self.path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, latency) VALUES (?, ?, ?, ?)",
+                    (key, value, created_at, latency),
+                )
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (created_at - self.ttl_seconds,))
+        except sqlite3.Error as e:
+            logging.warning(f"Response cache write failed: {e}")
+
+    def clear(self):
+        """Drops every cached entry."""
+        with self._lock:
+            self._memory.clear()
+        if self.path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Returns hit/miss counts and the upstream latency saved by hits."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "memory_entries": len(self._memory),
+            }
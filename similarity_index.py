@@ -0,0 +1,202 @@
+import os
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+import numpy as np
+
+NUM_PERMUTATIONS = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("EMAIL_SIMILARITY_THRESHOLD", "0.8"))
+DEFAULT_MAX_ENTRIES = 100_000
+MAX_CANDIDATES = 64
+# lookup() reads only the newest MAX_CANDIDATES ids of a bucket, so older ones are dropped
+MAX_BUCKET_SIZE = MAX_CANDIDATES
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+_WORD_PATTERN = re.compile(r"\w+")
+_rng = np.random.RandomState(7105)
+_PERM_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERMUTATIONS).astype(np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Returns the set of word n-grams of text (lower-cased, punctuation ignored)."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def shingle_hashes(text):
+    """Returns the sorted, de-duplicated 31-bit hashes of the shingles of text."""
+    shingle_set = shingles(text)
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingle_set),
+        dtype=np.uint64, count=len(shingle_set),
+    )
+    return np.unique(hashes % _MERSENNE_PRIME)
+
+
+def minhash_signature(hashes):
+    """Computes a NUM_PERMUTATIONS-long MinHash signature with vectorised universal hashing."""
+    if not len(hashes):
+        return np.full(NUM_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint64)
+    # (a*h + b) mod p stays below 2**63 because a, h < 2**31
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME).min(axis=0)
+
+
+def jaccard(a, b):
+    """Exact Jaccard similarity of two sorted, unique hash arrays."""
+    if not len(a) and not len(b):
+        return 1.0
+    common = len(np.intersect1d(a, b, assume_unique=True))
+    return common / (len(a) + len(b) - common)
+
+
+def words(text):
+    """Returns the set of lower-cased words of text."""
+    return set(_WORD_PATTERN.findall(text.lower()))
+
+
+class _Entry:
+    __slots__ = ("hashes", "words", "band_keys", "recipient", "sender", "email_text")
+
+    def __init__(self, hashes, words, band_keys, recipient, sender, email_text):
+        self.hashes = hashes
+        self.words = words
+        self.band_keys = band_keys
+        self.recipient = recipient
+        self.sender = sender
+        self.email_text = email_text
+
+
+class SimilarityIndex:
+    """MinHash/LSH index of past drafts, partitioned by purpose, tone and length.
+
+    LSH banding over MinHash signatures finds candidates in constant time; each candidate is
+    then checked against the exact Jaccard similarity of the word-trigram shingles, so
+    lookup() only returns a stored draft whose key points are at least `threshold` similar.
+    A draft is never reused if it mentions a word that was in its own key points but is not
+    in the new ones (an edited fact such as "Senior" -> "Junior"). The draft is adapted to
+    the new recipient and sender.
+    """
+
+    def __init__(self, threshold=DEFAULT_SIMILARITY_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._buckets = defaultdict(OrderedDict)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    @staticmethod
+    def _band_keys(partition, signature):
+        return [
+            (partition, band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+            for band in range(BANDS)
+        ]
+
+    def add(self, key_points, recipient, sender, purpose, tone, length, email_text):
+        """Indexes a generated draft."""
+        partition = (purpose, tone, length)
+        hashes = shingle_hashes(key_points)
+        band_keys = self._band_keys(partition, minhash_signature(hashes))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(
+                hashes, frozenset(words(key_points)), band_keys, recipient, sender, email_text
+            )
+            for band_key in band_keys:
+                bucket = self._buckets[band_key]
+                bucket[entry_id] = None
+                if len(bucket) > MAX_BUCKET_SIZE:
+                    bucket.popitem(last=False)
+            while len(self._entries) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, entry = self._entries.popitem(last=False)
+        for band_key in entry.band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is None:
+                continue
+            bucket.pop(entry_id, None)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def lookup(self, key_points, recipient, sender, purpose, tone, length):
+        """Returns (draft, similarity) for the closest stored request above the threshold, or None."""
+        partition = (purpose, tone, length)
+        hashes = shingle_hashes(key_points)
+        signature = minhash_signature(hashes)
+        with self._lock:
+            # A dict rather than a set keeps candidates in newest-first order for ties
+            candidates = {}
+            for band_key in self._band_keys(partition, signature):
+                bucket = self._buckets.get(band_key)
+                if not bucket:
+                    continue
+                # Newest first: recent drafts are the likeliest near-duplicates
+                for entry_id in reversed(bucket):
+                    candidates[entry_id] = None
+                    if len(candidates) >= MAX_CANDIDATES:
+                        break
+                if len(candidates) >= MAX_CANDIDATES:
+                    break
+            scored = []
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                score = jaccard(entry.hashes, hashes)
+                if score >= self.threshold:
+                    scored.append((score, entry))
+            new_words = words(key_points)
+            best, best_score = None, 0.0
+            # sorted() is stable, so equal scores keep the newest-first candidate order
+            for score, entry in sorted(scored, key=lambda item: item[0], reverse=True):
+                if self._mentions_stale_words(entry, new_words):
+                    self.rejected += 1
+                    continue
+                best, best_score = entry, score
+                break
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        logging.info(f"Reusing a near-duplicate draft (similarity {best_score:.2f}).")
+        return self._adapt(best, recipient, sender), best_score
+
+    @staticmethod
+    def _mentions_stale_words(entry, new_words):
+        """True if the draft uses a word its key points had but the new key points dropped."""
+        stale = entry.words - new_words
+        return bool(stale) and not stale.isdisjoint(words(entry.email_text))
+
+    @staticmethod
+    def _adapt(entry, recipient, sender):
+        """Swaps the stored recipient and sender names for the new ones.
+
+        Both names are replaced in a single pass, so swapping sender and recipient works.
+        """
+        names = {old: new for old, new in ((entry.recipient, recipient), (entry.sender, sender))
+                 if old and new and old != new}
+        if not names:
+            return entry.email_text
+        # Longest first so "Ann Lee" wins over "Ann"
+        pattern = "|".join(re.escape(old) for old in sorted(names, key=len, reverse=True))
+        return re.sub(rf"\b(?:{pattern})\b", lambda match: names[match.group()], entry.email_text)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "rejected_stale": self.rejected, "threshold": self.threshold}
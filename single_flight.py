@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one upstream call (thread version).
+
+    The first caller for a key becomes the leader and runs the work; callers that arrive
+    while it is in flight wait for and share its result, or its exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def begin(self, key):
+        """Joins or starts the flight for key; returns (flight, is_leader)."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.coalesced += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def finish(self, key, flight, result=None, error=None):
+        """Publishes the leader's outcome to every follower and retires the flight."""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result, flight.error = result, error
+        flight.done.set()
+
+    def wait(self, flight, timeout=None):
+        """Waits as a follower; re-raises the leader's exception."""
+        if not flight.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for an identical in-flight request")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def do(self, key, fn, timeout=None):
+        """Runs fn() once for all concurrent callers with the same key."""
+        flight, is_leader = self.begin(key)
+        if not is_leader:
+            return self.wait(flight, timeout)
+        try:
+            result = fn()
+        except BaseException as e:
+            # Includes KeyboardInterrupt/GeneratorExit so followers are never left hanging
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+
+class _AsyncFlight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight.
+
+    The shared work runs in its own task. A caller that is cancelled stops waiting
+    without affecting the others; the upstream task is cancelled only once every
+    waiter has gone.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn):
+        flight = self._flights.get(key)
+        if flight is None or flight.abandoned:
+            flight = self._flights[key] = _AsyncFlight(asyncio.ensure_future(coro_fn()))
+
+            def retire(task, key=key, flight=flight):
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+            flight.task.add_done_callback(retire)
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
@@ -0,0 +1,77 @@
+import math
+import threading
+from collections import deque
+from metrics import percentile
+
+MIN_SAMPLES = 10
+SAMPLE_WINDOW = 200
+# Headroom over the observed p95 so typical drafts finish in one call
+HEADROOM = 1.2
+# Learned budgets stay between these multiples of the fixed default
+MIN_BUDGET_FACTOR = 0.5
+MAX_BUDGET_FACTOR = 2
+MIN_CONTINUATION_TOKENS = 128
+
+
+def max_tokens_for_length(length):
+    """Maps the Short/Medium/Long length option to a completion token limit."""
+    if length == "Short":
+        return 150
+    elif length == "Medium":
+        return 300
+    else: # Long
+        return 500
+
+
+class TokenBudget:
+    """Learns completion token limits per (purpose, length) from observed completion sizes.
+
+    Until a combination has MIN_SAMPLES observations the fixed Short/Medium/Long default is
+    used; afterwards the limit is the observed p95 plus headroom, so limits follow what the
+    model actually writes instead of cutting long drafts off or reserving unused quota.
+    """
+
+    def __init__(self, window=SAMPLE_WINDOW, min_samples=MIN_SAMPLES, headroom=HEADROOM):
+        self.window = window
+        self.min_samples = min_samples
+        self.headroom = headroom
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def max_tokens(self, purpose, length):
+        default = max_tokens_for_length(length)
+        with self._lock:
+            samples = self._samples.get((purpose, length))
+            if not samples or len(samples) < self.min_samples:
+                return default
+            learned = percentile(samples, 95) * self.headroom
+        # Round up to a multiple of 16 so the limit (and the scheduler's estimate) stays stable
+        budget = int(math.ceil(learned / 16) * 16)
+        return max(int(default * MIN_BUDGET_FACTOR), min(budget, default * MAX_BUDGET_FACTOR))
+
+    def continuation_tokens(self, purpose, length):
+        """Token limit for one continuation of a draft that hit its limit."""
+        return max(MIN_CONTINUATION_TOKENS, self.max_tokens(purpose, length) // 2)
+
+    def observe(self, purpose, length, completion_tokens):
+        """Records the total completion tokens of a finished draft, continuations included."""
+        if not completion_tokens:
+            return
+        with self._lock:
+            samples = self._samples.get((purpose, length))
+            if samples is None:
+                samples = self._samples[(purpose, length)] = deque(maxlen=self.window)
+            samples.append(completion_tokens)
+
+    def stats(self):
+        with self._lock:
+            keys = list(self._samples)
+        return {f"{purpose} / {length}": self.max_tokens(purpose, length) for purpose, length in keys}
+
+
+_token_budget = TokenBudget()
+
+
+def get_token_budget():
+    """Returns the process-wide token budget shared by every generator."""
+    return _token_budget